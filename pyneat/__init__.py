@@ -1,6 +1,8 @@
 from conf import Conf
 from datalogger import DataLogger
 from datalogger import DataObserver
+from datalogger import SpeciesSnapshot
+from datalogger import DataRecorder
 from innovations import Innovations
 from organism import Organism
 from species import Species
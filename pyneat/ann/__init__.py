@@ -1 +1,6 @@
 from rnn import RecurrentNeuralNetwork
+from batch import BatchNeuralNetwork
+from sparse import SparseNeuralNetwork
+from feedforward import FeedForwardNeuralNetwork
+from compiled import CompiledNeuralNetwork
+from compiled import CompiledFeedForwardNetwork
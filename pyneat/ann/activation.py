@@ -0,0 +1,99 @@
+"""Activation functions.
+
+Registry of activation functions built only from numpy ufuncs, so applying
+one to an array never calls back into python per element. Functions are
+referenced by their integer id, which is what genomes store per neuron.
+Each function also has an equivalent python float expression used by
+compiled networks, where %s is replaced by the argument.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Activation = namedtuple('Activation', ['name', 'func', 'expr'])
+
+def sigmoid(x):
+    """Steepened sigmoid, 1/(1+exp(-4.9x)) written in terms of tanh."""
+    y = np.multiply(x, 2.45)
+
+    np.tanh(y, out=y)
+
+    y *= 0.5
+    y += 0.5
+
+    return y
+
+def tanh(x):
+    return np.tanh(x)
+
+def relu(x):
+    return np.maximum(x, 0.0)
+
+def gaussian(x):
+    y = np.square(x)
+
+    np.negative(y, out=y)
+    np.exp(y, out=y)
+
+    return y
+
+def sine(x):
+    return np.sin(x)
+
+def identity(x):
+    return np.array(x, dtype=float)
+
+SIGMOID, TANH, RELU, GAUSSIAN, SINE, IDENTITY = range(6)
+
+ACTIVATIONS = (
+        Activation('sigmoid', sigmoid, '0.5+0.5*tanh(2.45*(%s))'),
+        Activation('tanh', tanh, 'tanh(%s)'),
+        Activation('relu', relu, 'max(%s, 0.0)'),
+        Activation('gaussian', gaussian, 'exp(-(%s)**2)'),
+        Activation('sine', sine, 'sin(%s)'),
+        Activation('identity', identity, '(%s)'),
+        )
+
+def by_name(name):
+    """Returns the id of the activation function called name."""
+    for x in xrange(len(ACTIVATIONS)):
+        if ACTIVATIONS[x].name == name:
+            return x
+
+    raise KeyError('Unknown activation function %s' % (name,))
+
+def groups(ids):
+    """Groups neurons by activation function.
+
+    Args:
+        ids: Activation id of each neuron.
+
+    Returns:
+        List of 2-tuples containing the function and the indexes of the
+        neurons using it. When every neuron shares a single function the
+        indexes are None.
+    """
+    ids = np.asarray(ids, dtype=int)
+
+    unique = np.unique(ids)
+
+    if len(unique) == 1:
+        return [(ACTIVATIONS[unique[0]].func, None)]
+
+    return [(ACTIVATIONS[x].func, np.flatnonzero(ids == x)) for x in unique]
+
+def apply(groups, x):
+    """Applies grouped activation functions along the first axis of x.
+
+    Each group is a single vectorized call regardless of how many neurons
+    belong to it.
+    """
+    if len(groups) == 1 and groups[0][1] is None:
+        return groups[0][0](x)
+
+    out = np.empty(x.shape)
+
+    for func, idx in groups:
+        out[idx] = func(x[idx])
+
+    return out
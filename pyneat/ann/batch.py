@@ -0,0 +1,116 @@
+from . import activation
+
+import numpy as np
+
+class BatchNeuralNetwork(object):
+    """Population of recurrent neural networks.
+
+    Packs the weights of many RecurrentNeuralNetwork instances into padded
+    tensors so a single timestep of every network is performed with a
+    handful of batched matrix multiplications. Networks with fewer hidden
+    neurons than the largest one are padded with zero weights, padded
+    neurons never contribute to the outputs.
+
+    Attributes:
+        dim: 3-tuple of input, padded hidden, and output nodes
+        size: Number of networks in the batch
+        act_func: Networks activation function, must accept numpy arrays.
+            When omitted the activation ids of each network are used.
+    """
+    def __init__(self, nets, act_func=None):
+        if len(nets) == 0:
+            raise ValueError('Cannot create batch from zero networks')
+
+        num_input = nets[0].dim[0]
+        num_output = nets[0].dim[2]
+
+        for net in nets:
+            if net.dim[0] != num_input or net.dim[2] != num_output:
+                raise ValueError('Networks must share input and output '
+                        'dimensions')
+
+        num_hidden = max(map(lambda x: x.dim[1], nets))
+
+        self.dim = (num_input, num_hidden, num_output)
+        self.size = len(nets)
+        self.act_func = act_func
+        self.hidden_act = act_func
+        self.output_act = act_func
+
+        self.wi = np.zeros((self.size, num_hidden, num_input))
+        self.wh = np.zeros((self.size, num_hidden, num_hidden))
+        self.wo = np.zeros((self.size, num_output, num_input+num_hidden))
+        self.wb = np.zeros((self.size, num_hidden, num_output))
+
+        for k, net in enumerate(nets):
+            h = net.dim[1]
+
+            self.wi[k, :h, :] = net.wi
+            self.wh[k, :h, :h] = net.wh
+            self.wo[k, :, :num_input] = net.wo[:, :num_input]
+            self.wo[k, :, num_input:num_input+h] = net.wo[:, num_input:]
+            self.wb[k, :h, :] = net.wb
+
+        if not act_func and all(x.activations is not None for x in nets):
+            hidden = np.empty((self.size, num_hidden), dtype=int)
+            output = np.empty((self.size, num_output), dtype=int)
+
+            hidden.fill(activation.IDENTITY)
+
+            for k, net in enumerate(nets):
+                h = net.dim[1]
+
+                hidden[k, :h] = net.activations[:h]
+                output[k, :] = net.activations[h:]
+
+            self.hidden_act = self.__grouped(hidden)
+            self.output_act = self.__grouped(output)
+
+        self.dh = np.zeros((self.size, num_hidden))
+        self.do = np.zeros((self.size, num_output))
+
+    def __grouped(self, ids):
+        groups = activation.groups(ids.ravel())
+
+        return lambda x: activation.apply(groups, x.ravel()).reshape(x.shape)
+
+    def activate(self, data):
+        """Activates every network in the batch.
+
+        Performs one timestep of each network.
+
+        Args:
+            data: input data of len(dimension[0]) shared by every network,
+                or an array of shape (size, dimension[0]) with one row per
+                network.
+
+        Returns:
+            Array of shape (size, dimension[2]) containing the outputs.
+        """
+        di = np.asarray(data, dtype=float)
+
+        if di.ndim == 1:
+            di = np.broadcast_to(di, (self.size, self.dim[0]))
+
+        dtemp = (np.matmul(self.wi, di[:, :, None])+
+                np.matmul(self.wh, self.dh[:, :, None])+
+                np.matmul(self.wb, self.do[:, :, None]))[:, :, 0]
+
+        if self.hidden_act and dtemp.shape[1] > 0:
+            self.dh = self.hidden_act(dtemp)
+        else:
+            self.dh = dtemp
+
+        dconcat = np.concatenate((di, self.dh), axis=1)
+
+        self.do = np.matmul(self.wo, dconcat[:, :, None])[:, :, 0]
+
+        if self.output_act:
+            self.do = self.output_act(self.do)
+
+        return self.do
+
+    def reset(self):
+        """Clears the recurrent state of every network."""
+        self.dh = np.zeros(self.dh.shape)
+        self.do = np.zeros(self.do.shape)
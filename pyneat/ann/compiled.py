@@ -0,0 +1,194 @@
+from . import activation
+from .sparse import SparseNeuralNetwork
+from .feedforward import FeedForwardNeuralNetwork
+
+import math
+import logging
+import numpy as np
+
+class CompiledNeuralNetwork(object):
+    """Compiled Recurrent Neural Network.
+
+    Generates python source for the network, working on plain floats, and
+    compiles it. For small networks this avoids the numpy call overhead that
+    dominates RecurrentNeuralNetwork.activate. The source only depends on
+    the structure, the weights are bound into the closure returned by the
+    compiled build function, so a template is compiled once per structure.
+
+    Computes the same timestep as RecurrentNeuralNetwork.
+
+    Attributes:
+        dimension: 3-tuple of input, hidden, and output nodes
+        source: Generated source.
+        build: Compiled build function of the source.
+        weights: List of the weight of each link.
+        activate: Activates the network, see RecurrentNeuralNetwork.
+    """
+    def __init__(self, dimension, source, build, weights):
+        self.dim = dimension
+        self.source = source
+        self.build = build
+        self.weights = weights
+        self.activate = build(weights)
+
+    @staticmethod
+    def expression(terms, act):
+        """Source of a neuron.
+
+        Args:
+            terms: List of 2-tuples of the weight and value variables.
+            act: Activation id, None for identity.
+        """
+        total = '+'.join('%s*%s' % x for x in terms) if terms else '0.0'
+
+        if act is None:
+            return total
+
+        return activation.ACTIVATIONS[act].expr % (total,)
+
+    @classmethod
+    def generate(cls, dimension, activations, inodes, onodes):
+        """Generates the source of the build function."""
+        ni, nh, no = dimension
+        nio = ni+nh
+
+        act = lambda x: activations[x-ni] if activations is not None \
+                else None
+
+        hidden, output = SparseNeuralNetwork.edges(dimension, inodes, onodes)
+
+        # Values read by hidden neurons are the inputs followed by the
+        # previous hidden and output values, output neurons read the inputs
+        # followed by the new hidden values.
+        previous = ['x%d' % x for x in xrange(ni)]+[
+                'ph%d' % x for x in xrange(nh)]+[
+                'po%d' % x for x in xrange(no)]
+        current = ['x%d' % x for x in xrange(ni)]+[
+                'h%d' % x for x in xrange(nh)]
+
+        lines = ['def build(weights):']
+
+        if len(inodes):
+            lines.append('    %s, = weights' %
+                    (', '.join('w%d' % x for x in xrange(len(inodes))),))
+
+        lines.append('    state = [%s]' % (', '.join(['0.0']*(nh+no)),))
+        lines.append('    def activate(data):')
+
+        if ni:
+            lines.append('        %s, = data' % (', '.join(current[:ni]),))
+
+        if nh+no:
+            lines.append('        %s, = state' % (', '.join(previous[ni:]),))
+
+        for x in xrange(nh):
+            terms = [('w%d' % link, previous[src]) for src, dst, link in
+                    zip(*hidden) if dst == x]
+
+            lines.append('        h%d = %s' % (x,
+                cls.expression(terms, act(ni+x))))
+
+        for x in xrange(no):
+            terms = [('w%d' % link, current[src]) for src, dst, link in
+                    zip(*output) if dst == x]
+
+            lines.append('        y%d = %s' % (x,
+                cls.expression(terms, act(nio+x))))
+
+        outputs = ['y%d' % x for x in xrange(no)]
+
+        if nh+no:
+            lines.append('        state[:] = (%s,)' %
+                    (', '.join(current[ni:]+outputs),))
+
+        return lines+cls.returns(outputs)
+
+    @staticmethod
+    def returns(outputs):
+        if len(outputs) == 1:
+            ret = outputs[0]
+        else:
+            ret = '[%s]' % (', '.join(outputs),)
+
+        return ['        return %s' % (ret,), '    return activate']
+
+    @classmethod
+    def template(cls, dimension, activations, inodes, onodes):
+        """Generates and compiles the source of a structure.
+
+        See Genome.genesis.
+        """
+        source = '\n'.join(cls.generate(dimension, activations, inodes,
+            onodes))+'\n'
+
+        ns = {'tanh': math.tanh, 'exp': math.exp, 'sin': math.sin}
+
+        exec compile(source, '<compiled network>', 'exec') in ns
+
+        logging.getLogger('rnn').debug('compiled network\n%s', source)
+
+        return dimension, source, ns['build']
+
+    @classmethod
+    def from_template(cls, template, weights):
+        dimension, source, build = template
+
+        return cls(list(dimension), source, build, weights.tolist())
+
+    def activate_sequence(self, data):
+        """Activates the network over a sequence of inputs.
+
+        See RecurrentNeuralNetwork.activate_sequence.
+        """
+        activate = self.activate
+
+        outputs = [activate(d) for d in np.asarray(data, dtype=float
+            ).reshape((-1, self.dim[0])).tolist()]
+
+        return np.array(outputs, dtype=float).reshape((-1, self.dim[2]))
+
+    def reset(self):
+        """Clears the recurrent state by rebuilding the closure."""
+        self.activate = self.build(self.weights)
+
+class CompiledFeedForwardNetwork(CompiledNeuralNetwork):
+    """Compiled Feed Forward Neural Network.
+
+    Same as CompiledNeuralNetwork but the neurons are computed in
+    topological order, computing what FeedForwardNeuralNetwork does.
+    """
+    @classmethod
+    def generate(cls, dimension, activations, inodes, onodes):
+        """Generates the source of the build function."""
+        ni, nh, no = dimension
+        nio = ni+nh
+
+        layer = FeedForwardNeuralNetwork.sort_layers(dimension, inodes,
+                onodes)
+
+        names = ['x%d' % x for x in xrange(ni)]+[
+                'h%d' % x for x in xrange(nh)]+[
+                'y%d' % x for x in xrange(no)]
+
+        lines = ['def build(weights):']
+
+        if len(inodes):
+            lines.append('    %s, = weights' %
+                    (', '.join('w%d' % x for x in xrange(len(inodes))),))
+
+        lines.append('    def activate(data):')
+
+        if ni:
+            lines.append('        %s, = data' % (', '.join(names[:ni]),))
+
+        for node in sorted(xrange(ni, sum(dimension)), key=lambda x: layer[x]):
+            terms = [('w%d' % link, names[src]) for link, (src, dst) in
+                    enumerate(zip(inodes.tolist(), onodes.tolist()))
+                    if dst == node]
+
+            act = activations[node-ni] if activations is not None else None
+
+            lines.append('        %s = %s' % (names[node],
+                cls.expression(terms, act)))
+
+        return lines+cls.returns(names[nio:])
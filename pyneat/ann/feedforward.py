@@ -0,0 +1,156 @@
+from . import activation
+
+import numpy as np
+
+class FeedForwardNeuralNetwork(object):
+    """Feed Forward Neural Network.
+
+    Network without recurrent links. The neurons are sorted topologically
+    into layers once, where a layer only depends on the layers before it.
+    Each layer is evaluated with one vectorized operation so a single call
+    to activate propagates the input all the way to the outputs.
+
+    Attributes:
+        dimension: 3-tuple of input, hidden, and output nodes
+        layers: List of layers, each a 5-tuple of the neurons in the layer,
+            the source neuron, target position in the layer, and weight of
+            each link into the layer, and the activation groups of the
+            layer.
+    """
+    def __init__(self, dimension, layers):
+        self.dim = dimension
+        self.layers = layers
+        self.values = np.zeros(sum(dimension))
+
+    @staticmethod
+    def sort_layers(dimension, inodes, onodes):
+        """Sorts the neurons into layers.
+
+        Args:
+            dimension: 3-tuple of input, hidden, and output nodes
+            inodes: array of input node indexes
+            onodes: array of output node indexes
+
+        Returns:
+            Layer of every neuron, inputs are in layer 0.
+
+        Raises:
+            ValueError: The links contain a cycle or lead into an input.
+        """
+        total = sum(dimension)
+
+        if np.any(onodes < dimension[0]):
+            raise ValueError('Feed forward network cannot have links into '
+                    'an input')
+
+        sources = [[] for x in xrange(total)]
+
+        for x, y in zip(inodes.tolist(), onodes.tolist()):
+            sources[y].append(x)
+
+        layer = [0]*total
+        state = [0]*total
+
+        # Iterative depth first search, state 1 is in progress and 2 done
+        for node in xrange(dimension[0], total):
+            stack = [node]
+
+            while stack:
+                x = stack[-1]
+
+                if state[x] == 0:
+                    state[x] = 1
+
+                    for y in sources[x]:
+                        if state[y] == 1:
+                            raise ValueError('Feed forward network cannot '
+                                    'contain a cycle')
+                        elif state[y] == 0 and y >= dimension[0]:
+                            stack.append(y)
+                else:
+                    stack.pop()
+
+                    if state[x] == 1:
+                        state[x] = 2
+
+                        layer[x] = 1+max([layer[y] for y in sources[x]]+[0])
+
+        return np.array(layer, dtype=int)
+
+    @classmethod
+    def template(cls, dimension, activations, inodes, onodes):
+        """Precomputes everything needed to build networks of a structure.
+
+        See Genome.genesis.
+        """
+        layer = cls.sort_layers(dimension, inodes, onodes)
+
+        if activations is None:
+            activations = [activation.IDENTITY]*sum(dimension[1:])
+
+        activations = np.concatenate((
+            np.zeros(dimension[0], dtype=int),
+            np.asarray(activations, dtype=int)))
+
+        layers = []
+
+        for x in xrange(1, layer.max()+1 if len(layer) else 1):
+            nodes = np.flatnonzero(layer == x)
+
+            links = np.flatnonzero(layer[onodes] == x)
+
+            layers.append((
+                nodes,
+                inodes[links],
+                np.searchsorted(nodes, onodes[links]),
+                links,
+                activation.groups(activations[nodes])))
+
+        return dimension, layers
+
+    @classmethod
+    def from_template(cls, template, weights):
+        dimension, layers = template
+
+        return cls(list(dimension), [(nodes, src, dst, weights[links], groups)
+            for nodes, src, dst, links, groups in layers])
+
+    def activate(self, data):
+        """Activates the network.
+
+        Propagates the input through every layer of the network.
+
+        Args:
+            data: input data of len(dimension[0])
+
+        Returns:
+            A list of output values of len(dimension[2])
+        """
+        values = self.values
+
+        values[:self.dim[0]] = data
+
+        for nodes, src, dst, weights, groups in self.layers:
+            dtemp = np.bincount(dst, values[src]*weights, len(nodes))
+
+            values[nodes] = activation.apply(groups, dtemp)
+
+        return values[sum(self.dim[:2]):].squeeze().tolist()
+
+    def activate_sequence(self, data):
+        """Activates the network over a sequence of inputs.
+
+        See RecurrentNeuralNetwork.activate_sequence.
+        """
+        di = np.asarray(data, dtype=float).reshape((-1, self.dim[0]))
+
+        outputs = np.empty((len(di), self.dim[2]))
+
+        for t in xrange(len(di)):
+            outputs[t] = self.activate(di[t])
+
+        return outputs
+
+    def reset(self):
+        """Does nothing, outputs only depend on the current input."""
+        pass
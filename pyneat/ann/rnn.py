@@ -1,3 +1,5 @@
+from . import activation
+
 import numpy as np
 
 import logging
@@ -5,25 +7,60 @@ import logging
 class RecurrentNeuralNetwork(object):
     """Recurrent Neural Network.
 
+    The weight matrices wi, wh, wo, and wb are views into the single flat
+    array weights, so every weight of the network can be assigned at once
+    using the indexes returned by link_index.
+
     Attributes:
         dimension: 3-tuple of input, hidden, and output nodes
         act_func: Networks activation function
+        activations: Activation id of each hidden and output node, takes
+            precedence over act_func. See activation module.
     """
-    def __init__(self, dimension, act_func=None):
+    def __init__(self, dimension, act_func=None, activations=None):
         self.dim = dimension
-        self.wi = np.zeros((dimension[1], dimension[0]))
-        self.wh = np.zeros((dimension[1], dimension[1]))
-        self.wo = np.zeros((dimension[2], sum(dimension[:2])))
-        self.wb = np.zeros((dimension[1], dimension[2]))
+
+        shapes = ((dimension[1], dimension[0]),
+                (dimension[1], dimension[1]),
+                (dimension[2], sum(dimension[:2])),
+                (dimension[1], dimension[2]))
+
+        self.offsets = [0]
+
+        for shape in shapes:
+            self.offsets.append(self.offsets[-1]+shape[0]*shape[1])
+
+        self.weights = np.zeros(self.offsets[-1])
+
+        self.wi, self.wh, self.wo, self.wb = [
+                self.weights[self.offsets[x]:self.offsets[x+1]].reshape(
+                    shapes[x]) for x in xrange(len(shapes))]
 
         self.dh = np.zeros((dimension[1], 1))
         self.do = np.zeros((dimension[2], 1))
+
+        self.batch_dh = None
+        self.batch_do = None
         
         self.act_func = None
+        self.activations = None
+        self.hidden_act = None
+        self.output_act = None
+
+        if activations is not None:
+            self.activations = np.asarray(activations, dtype=int)
 
-        if act_func:
+            hidden = activation.groups(self.activations[:dimension[1]])
+            output = activation.groups(self.activations[dimension[1]:])
+
+            self.hidden_act = lambda x: activation.apply(hidden, x)
+            self.output_act = lambda x: activation.apply(output, x)
+        elif act_func:
             self.act_func = np.vectorize(act_func)
 
+            self.hidden_act = self.act_func
+            self.output_act = self.act_func
+
         self.log = logging.getLogger('rnn')
 
     def __input(self, node):
@@ -44,6 +81,82 @@ class RecurrentNeuralNetwork(object):
     def __onode(self, node):
         return node - sum(self.dim[:2])
 
+    def link_index(self, inode, onode):
+        """Index of a link in weights.
+
+        Args:
+            inode: input node index
+            onode: output node index
+
+        Returns:
+            Index into weights, or -1 if the link cannot exist.
+        """
+        if self.__input(inode) and self.__hidden(onode):
+            row, col, x = self.__hnode(onode), self.__inode(inode), 0
+        elif self.__input(inode) and self.__output(onode):
+            row, col, x = self.__onode(onode), self.__inode(inode), 2
+        elif self.__hidden(inode) and self.__hidden(onode):
+            row, col, x = self.__hnode(inode), self.__hnode(onode), 1
+        elif self.__hidden(inode) and self.__output(onode):
+            row, col, x = (self.__onode(onode),
+                    self.dim[0]+self.__hnode(inode), 2)
+        elif self.__output(inode) and self.__hidden(onode):
+            row, col, x = self.__hnode(onode), self.__onode(inode), 3
+        else:
+            return -1
+
+        return self.offsets[x]+row*self.__columns(x)+col
+
+    def __columns(self, x):
+        return (self.dim[0], self.dim[1], sum(self.dim[:2]), self.dim[2])[x]
+
+    @classmethod
+    def template(cls, dimension, activations, inodes, onodes):
+        """Precomputes everything needed to build networks of a structure.
+
+        Args:
+            dimension: 3-tuple of input, hidden, and output nodes
+            activations: Activation id of each hidden and output node.
+            inodes: Input node index of each link.
+            onodes: Output node index of each link.
+
+        Returns:
+            4-tuple of the dimension, activations, index of each valid link
+            into weights, and the position of the valid links in inodes or
+            None when all are valid.
+        """
+        net = cls(list(dimension), activations=activations)
+
+        index = np.array([net.link_index(x, y)
+            for x, y in zip(inodes.tolist(), onodes.tolist())], dtype=int)
+
+        select = None
+
+        if np.any(index < 0):
+            for x in np.flatnonzero(index < 0):
+                net.log.error('Cannot create link from %d to %d',
+                        inodes[x], onodes[x])
+
+            select = np.flatnonzero(index >= 0)
+
+            index = index[select]
+
+        return dimension, activations, index, select
+
+    @classmethod
+    def from_template(cls, template, weights):
+        """Creates network from a template and the weight of each link."""
+        dimension, activations, index, select = template
+
+        net = cls(list(dimension), activations=activations)
+
+        if select is not None:
+            weights = weights[select]
+
+        net.weights[index] = weights
+
+        return net
+
     def add_link(self, inode, onode, weight=1.0):
         """Adds link to network.
 
@@ -57,22 +170,16 @@ class RecurrentNeuralNetwork(object):
             onode: output node index
             weight: weight of the link
         """
-        if self.__input(inode) and self.__hidden(onode):
-            self.wi[self.__hnode(onode), self.__inode(inode)] = weight
-        elif self.__input(inode) and self.__output(onode):
-            self.wo[self.__onode(onode), self.__inode(inode)] = weight
-        elif self.__hidden(inode) and self.__hidden(onode):
-            self.wh[self.__hnode(inode), self.__hnode(onode)] = weight
-        elif self.__hidden(inode) and self.__output(onode):
-            self.wo[self.__onode(onode), self.dim[0]+self.__hnode(inode)] = weight
-        elif self.__output(inode) and self.__hidden(onode):
-            self.wb[self.__hnode(onode), self.__onode(inode)] =  weight
-        else:
+        index = self.link_index(inode, onode)
+
+        if index < 0:
             self.log.error('Cannot create link from %d to %d',
                     inode, onode)
 
             return False
 
+        self.weights[index] = weight
+
         return True
 
     def activate(self, data):
@@ -90,8 +197,8 @@ class RecurrentNeuralNetwork(object):
 
         dtemp = np.dot(self.wi, di)+np.dot(self.wh, self.dh)+np.dot(self.wb, self.do)
 
-        if self.act_func and dtemp.shape[0] > 0:
-            self.dh = self.act_func(dtemp)
+        if self.hidden_act and dtemp.shape[0] > 0:
+            self.dh = self.hidden_act(dtemp)
         else:
             self.dh = dtemp
 
@@ -99,7 +206,121 @@ class RecurrentNeuralNetwork(object):
 
         self.do = np.dot(self.wo, dconcat)
 
-        if self.act_func:
-            self.do = self.act_func(self.do)
+        if self.output_act:
+            self.do = self.output_act(self.do)
 
         return self.do.squeeze().tolist()
+
+    def activate_sequence(self, data):
+        """Activates the network over a sequence of inputs.
+
+        Equivalent to calling activate on each row of data in order,
+        continuing from and updating the recurrent state. The input terms
+        of every timestep are computed up front with one product each, the
+        recurrence then runs over buffers allocated once per call.
+
+        Args:
+            data: input data of shape (T, dimension[0]), one row per
+                timestep.
+
+        Returns:
+            Array of shape (T, dimension[2]) containing the outputs.
+        """
+        ni, nh, no = self.dim
+
+        di = np.asarray(data, dtype=float).reshape((-1, ni))
+
+        # Input terms of the hidden and output neurons at every timestep
+        xh = np.dot(di, self.wi.T)
+        xo = np.dot(di, self.wo[:, :ni].T)
+
+        wh, wb = self.wh, self.wb
+        wo = np.ascontiguousarray(self.wo[:, ni:])
+
+        dh = self.dh[:, 0].copy()
+        do = self.do[:, 0].copy()
+
+        dtemp = np.empty(nh)
+        btemp = np.empty(nh)
+        otemp = np.empty(no)
+
+        outputs = np.empty((len(di), no))
+
+        for t in xrange(len(di)):
+            np.dot(wh, dh, out=dtemp)
+            np.dot(wb, do, out=btemp)
+
+            dtemp += btemp
+            dtemp += xh[t]
+
+            if self.hidden_act and nh > 0:
+                dh[:] = self.hidden_act(dtemp)
+            else:
+                dh[:] = dtemp
+
+            np.dot(wo, dh, out=otemp)
+
+            otemp += xo[t]
+
+            if self.output_act:
+                outputs[t] = self.output_act(otemp)
+            else:
+                outputs[t] = otemp
+
+            do = outputs[t]
+
+        self.dh = dh.reshape((nh, 1))
+        self.do = do.reshape((no, 1)).copy()
+
+        return outputs
+
+    def reset(self):
+        """Clears the recurrent state of activate and activate_batch.
+
+        The network then behaves as if it had just been created, e.g. at
+        the start of an episode.
+        """
+        self.dh = np.zeros((self.dim[1], 1))
+        self.do = np.zeros((self.dim[2], 1))
+
+        self.batch_dh = None
+        self.batch_do = None
+
+    def activate_batch(self, data):
+        """Activates the network on many independent streams.
+
+        Performs one timestep of the network for every row of data. Each
+        row is its own stream with a separate recurrent state, kept between
+        calls as long as the number of rows does not change. The state is
+        separate from the one used by activate.
+
+        Args:
+            data: input data of shape (N, dimension[0])
+
+        Returns:
+            Array of shape (N, dimension[2]) containing the outputs.
+        """
+        di = np.asarray(data, dtype=float).reshape((-1, self.dim[0])).T
+
+        num = di.shape[1]
+
+        if self.batch_dh is None or self.batch_dh.shape[1] != num:
+            self.batch_dh = np.zeros((self.dim[1], num))
+            self.batch_do = np.zeros((self.dim[2], num))
+
+        dtemp = (np.dot(self.wi, di)+np.dot(self.wh, self.batch_dh)+
+                np.dot(self.wb, self.batch_do))
+
+        if self.hidden_act and dtemp.shape[0] > 0:
+            self.batch_dh = self.hidden_act(dtemp)
+        else:
+            self.batch_dh = dtemp
+
+        dconcat = np.concatenate((di, self.batch_dh))
+
+        self.batch_do = np.dot(self.wo, dconcat)
+
+        if self.output_act:
+            self.batch_do = self.output_act(self.batch_do)
+
+        return self.batch_do.T
@@ -0,0 +1,186 @@
+from . import activation
+
+import numpy as np
+
+import logging
+
+class SparseNeuralNetwork(object):
+    """Sparse Recurrent Neural Network.
+
+    Computes exactly what RecurrentNeuralNetwork does but stores only the
+    existing links, as edge lists sorted by target neuron. A timestep
+    gathers the source values of every edge and sums them per target, so
+    time and memory grow with the number of links rather than with the
+    square of the number of neurons.
+
+    Attributes:
+        dimension: 3-tuple of input, hidden, and output nodes
+        activations: Activation id of each hidden and output node. See
+            activation module.
+    """
+    def __init__(self, dimension, activations=None):
+        self.dim = dimension
+
+        self.dh = np.zeros(dimension[1])
+        self.do = np.zeros(dimension[2])
+
+        self.activations = None
+        self.hidden_act = None
+        self.output_act = None
+
+        if activations is not None:
+            self.activations = np.asarray(activations, dtype=int)
+
+            hidden = activation.groups(self.activations[:dimension[1]])
+            output = activation.groups(self.activations[dimension[1]:])
+
+            self.hidden_act = lambda x: activation.apply(hidden, x)
+            self.output_act = lambda x: activation.apply(output, x)
+
+        self.hidden_edges = (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                np.zeros(0))
+        self.output_edges = (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                np.zeros(0))
+
+        self.log = logging.getLogger('rnn')
+
+    @staticmethod
+    def edges(dimension, inodes, onodes):
+        """Classifies links into edges.
+
+        Hidden edges read from the concatenation of the input, previous
+        hidden, and previous output values. Output edges read from the
+        concatenation of the input and current hidden values. Links are
+        mapped the same way RecurrentNeuralNetwork.add_link maps them into
+        its matrices.
+
+        Args:
+            dimension: 3-tuple of input, hidden, and output nodes
+            inodes: array of input node indexes
+            onodes: array of output node indexes
+
+        Returns:
+            2-tuple of hidden and output edges, each a 3-tuple of source
+            indexes, target indexes, and the position of the link in
+            inodes. Links that cannot exist are in neither.
+        """
+        ni = dimension[0]
+        nio = sum(dimension[:2])
+
+        inodes = np.asarray(inodes, dtype=int)
+        onodes = np.asarray(onodes, dtype=int)
+
+        input_in = inodes < ni
+        hidden_in = (inodes >= ni) & (inodes < nio)
+        output_in = (inodes >= nio) & (inodes < sum(dimension))
+        hidden_out = (onodes >= ni) & (onodes < nio)
+        output_out = (onodes >= nio) & (onodes < sum(dimension))
+
+        src = np.full(len(inodes), -1, dtype=int)
+        dst = np.full(len(inodes), -1, dtype=int)
+
+        ih = input_in & hidden_out
+        hh = hidden_in & hidden_out
+        oh = output_in & hidden_out
+
+        src[ih], dst[ih] = inodes[ih], onodes[ih]-ni
+        src[hh], dst[hh] = onodes[hh], inodes[hh]-ni
+        src[oh], dst[oh] = inodes[oh], onodes[oh]-ni
+
+        hidden = np.flatnonzero(ih | hh | oh)
+        hidden = hidden[np.argsort(dst[hidden], kind='mergesort')]
+
+        hidden_edges = (src[hidden], dst[hidden], hidden)
+
+        output = np.flatnonzero((input_in | hidden_in) & output_out)
+        output = output[np.argsort(onodes[output], kind='mergesort')]
+
+        output_edges = (inodes[output], onodes[output]-nio, output)
+
+        return hidden_edges, output_edges
+
+    @classmethod
+    def template(cls, dimension, activations, inodes, onodes):
+        """Precomputes everything needed to build networks of a structure.
+
+        See Genome.genesis.
+        """
+        hidden, output = cls.edges(dimension, inodes, onodes)
+
+        valid = np.zeros(len(inodes), dtype=bool)
+
+        valid[hidden[2]] = True
+        valid[output[2]] = True
+
+        log = logging.getLogger('rnn')
+
+        for x in np.flatnonzero(~valid):
+            log.error('Cannot create link from %d to %d',
+                    inodes[x], onodes[x])
+
+        return dimension, activations, hidden, output
+
+    @classmethod
+    def from_template(cls, template, weights):
+        dimension, activations, hidden, output = template
+
+        net = cls(list(dimension), activations)
+
+        net.hidden_edges = (hidden[0], hidden[1], weights[hidden[2]])
+        net.output_edges = (output[0], output[1], weights[output[2]])
+
+        return net
+
+    def activate(self, data):
+        """Activates the network.
+
+        Peforms one timestep of the network.
+
+        Args:
+            data: input data of len(dimension[0])
+
+        Returns:
+            A list of output values of len(dimension[2])
+        """
+        di = np.asarray(data, dtype=float).ravel()
+
+        src, dst, weights = self.hidden_edges
+
+        values = np.concatenate((di, self.dh, self.do))
+
+        dtemp = np.bincount(dst, values[src]*weights, self.dim[1])
+
+        if self.hidden_act and dtemp.shape[0] > 0:
+            self.dh = self.hidden_act(dtemp)
+        else:
+            self.dh = dtemp
+
+        src, dst, weights = self.output_edges
+
+        values = np.concatenate((di, self.dh))
+
+        self.do = np.bincount(dst, values[src]*weights, self.dim[2])
+
+        if self.output_act:
+            self.do = self.output_act(self.do)
+
+        return self.do.squeeze().tolist()
+
+    def activate_sequence(self, data):
+        """Activates the network over a sequence of inputs.
+
+        See RecurrentNeuralNetwork.activate_sequence.
+        """
+        di = np.asarray(data, dtype=float).reshape((-1, self.dim[0]))
+
+        outputs = np.empty((len(di), self.dim[2]))
+
+        for t in xrange(len(di)):
+            outputs[t] = self.activate(di[t])
+
+        return outputs
+
+    def reset(self):
+        """Clears the recurrent state."""
+        self.dh = np.zeros(self.dim[1])
+        self.do = np.zeros(self.dim[2])
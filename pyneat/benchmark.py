@@ -0,0 +1,408 @@
+"""Microbenchmarks of the NEAT hot paths.
+
+Times population, species, genome, and network operations across a grid
+of population and genome sizes, and compares results against a saved
+baseline.
+
+e.g.
+
+    python -m pyneat.benchmark run -o baseline.json
+    python -m pyneat.benchmark run -o current.json
+    python -m pyneat.benchmark compare baseline.json current.json
+
+compare exits with status 1 when any benchmark got slower than the
+threshold allows.
+"""
+from . import Conf
+from . import Organism
+from . import Population
+from .genotype import Genome
+from .table import PopulationTable
+
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import numpy as np
+
+from collections import OrderedDict
+
+def grow(genome, innovs, conf, size):
+    """Mutates genome until it has at least size genes."""
+    while len(genome.innovs) < size:
+        if np.random.random() < 0.5:
+            genome.mutate_neuron(innovs)
+        else:
+            genome.mutate_gene(innovs, conf)
+
+    return genome
+
+def population(conf, genome_size):
+    """Spawns population of genomes with genome_size genes.
+
+    Returns:
+        2-tuple of the population and the genome it was spawned from.
+    """
+    genome = Genome.minimal_fully_connected(0, (conf.num_input,
+        conf.num_output))
+
+    pop = Population(conf)
+
+    genome = grow(genome, pop.innovs, conf, genome_size)
+
+    innovs = pop.innovs
+
+    pop.spawn(genome)
+
+    # spawn restarts the innovation counter, keep the one of the grown genome
+    innovs.innov = max(innovs.innov, int(genome.innovs.max())+1)
+
+    for o in pop.organisms:
+        o.fitness = np.random.random()
+
+    return pop, genome
+
+def prepare_reproduction(pop):
+    """Runs the steps of Population.epoch that precede reproduction."""
+    table = PopulationTable(pop.species)
+
+    pop.cull_species(table)
+    pop.remove_stagnating_species(table)
+    pop.rank(table)
+    pop.remove_weak_species(table)
+    pop.remove_marked(table)
+
+def bench_spawn(conf, genome_size):
+    pop, genome = population(conf, genome_size)
+
+    def run():
+        Population(conf).spawn(genome)
+
+    return run
+
+def bench_speciate(conf, genome_size):
+    pop, genome = population(conf, genome_size)
+
+    organisms = []
+
+    for o in pop.organisms:
+        child = o.genome.duplicate(pop.innovs.next_genome())
+
+        child.mutate_weights(conf.mutate_power, 1.0)
+
+        organisms.append(Organism(child))
+
+    def run():
+        pop.speciate_all(organisms)
+
+    return run
+
+def bench_epoch(conf, genome_size):
+    pop, genome = population(conf, genome_size)
+
+    def run():
+        pop.epoch(None)
+
+    return run
+
+def bench_selection(conf, genome_size):
+    pop, genome = population(conf, genome_size)
+
+    def run():
+        prepare_reproduction(pop)
+
+    return run
+
+def bench_species_epoch(conf, genome_size):
+    pop, genome = population(conf, genome_size)
+
+    prepare_reproduction(pop)
+
+    species = max(pop.species, key=lambda x: len(x.organisms))
+
+    def run():
+        species.epoch(conf, pop.innovs)
+
+    return run
+
+def pair(conf, genome_size):
+    pop, genome = population(conf, genome_size)
+
+    return pop, pop.organisms[0].genome, pop.organisms[-1].genome
+
+def bench_crossover(conf, genome_size):
+    pop, mom, dad = pair(conf, genome_size)
+
+    def run():
+        for x in xrange(100):
+            mom.crossover(dad, 1.0, 0.5, pop.innovs)
+
+    return run
+
+def bench_compatible(conf, genome_size):
+    pop, mom, dad = pair(conf, genome_size)
+
+    def run():
+        for x in xrange(100):
+            mom.compatible(conf, dad)
+
+    return run
+
+def bench_mutate_weights(conf, genome_size):
+    pop, genome, other = pair(conf, genome_size)
+
+    def run():
+        for x in xrange(100):
+            genome.mutate_weights(conf.mutate_power, 1.0)
+
+    return run
+
+def bench_mutate_gene(conf, genome_size):
+    pop, genome, other = pair(conf, genome_size)
+
+    genomes = [genome.duplicate(x) for x in xrange(100)]
+
+    def run():
+        for g in genomes:
+            g.mutate_gene(pop.innovs, conf)
+
+    return run
+
+def bench_mutate_neuron(conf, genome_size):
+    pop, genome, other = pair(conf, genome_size)
+
+    genomes = [genome.duplicate(x) for x in xrange(100)]
+
+    def run():
+        for g in genomes:
+            g.mutate_neuron(pop.innovs)
+
+    return run
+
+def bench_genesis(conf, genome_size):
+    pop, genome, other = pair(conf, genome_size)
+
+    def run():
+        for x in xrange(100):
+            genome.genesis(conf)
+
+    return run
+
+def bench_duplicate(conf, genome_size):
+    pop, genome, other = pair(conf, genome_size)
+
+    def run():
+        for x in xrange(100):
+            genome.duplicate(x)
+
+    return run
+
+def bench_activate(conf, genome_size):
+    pop, genome, other = pair(conf, genome_size)
+
+    net = genome.genesis(conf)
+
+    data = np.random.random(conf.num_input).tolist()
+
+    def run():
+        for x in xrange(1000):
+            net.activate(data)
+
+    return run
+
+# Name, setup, operations per run, and whether it depends on pop_size
+BENCHMARKS = (
+        ('spawn', bench_spawn, 1, True),
+        ('speciate', bench_speciate, 1, True),
+        ('epoch', bench_epoch, 1, True),
+        ('selection', bench_selection, 1, True),
+        ('species_epoch', bench_species_epoch, 1, True),
+        ('crossover', bench_crossover, 100, False),
+        ('compatible', bench_compatible, 100, False),
+        ('mutate_weights', bench_mutate_weights, 100, False),
+        ('mutate_gene', bench_mutate_gene, 100, False),
+        ('mutate_neuron', bench_mutate_neuron, 100, False),
+        ('genesis', bench_genesis, 100, False),
+        ('duplicate', bench_duplicate, 100, False),
+        ('activate', bench_activate, 1000, False),
+        )
+
+def measure(setup, number, repeat):
+    """Times a benchmark.
+
+    Every repeat calls setup for a fresh state, then times a single run.
+
+    Returns:
+        List of seconds per operation of each repeat.
+    """
+    times = []
+
+    for x in xrange(repeat):
+        run = setup()
+
+        start = time.time()
+
+        run()
+
+        times.append((time.time()-start)/number)
+
+    return times
+
+def run(pop_sizes, genome_sizes, repeat=5, names=None, seed=1):
+    """Runs benchmarks over the grid of sizes.
+
+    Args:
+        pop_sizes: Population sizes.
+        genome_sizes: Number of genes of the genomes.
+        repeat: Repeats of each benchmark.
+        names: Names of the benchmarks to run, all when None.
+        seed: Random seed set before each benchmark.
+
+    Returns:
+        Dict of results in the order they ran, see save.
+    """
+    log = logging.getLogger('benchmark')
+
+    results = OrderedDict()
+
+    for name, setup, number, per_pop in BENCHMARKS:
+        if names and name not in names:
+            continue
+
+        for pop_size in (pop_sizes if per_pop else pop_sizes[:1]):
+            for genome_size in genome_sizes:
+                conf = Conf(pop_size=pop_size, allow_recurrent=True,
+                        fitness_cache_size=0)
+
+                np.random.seed(seed)
+
+                key = '%s[genes=%d]' % (name, genome_size)
+
+                if per_pop:
+                    key = '%s[pop=%d,genes=%d]' % (name, pop_size,
+                            genome_size)
+
+                times = measure(lambda: setup(conf, genome_size), number,
+                        repeat)
+
+                results[key] = {
+                        'best': min(times),
+                        'mean': sum(times)/len(times),
+                        'repeat': repeat,
+                        }
+
+                log.info('%s %.3fus', key, min(times)*1e6)
+
+    return results
+
+def save(results, path):
+    data = {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'time': time.time(),
+            'results': results,
+            }
+
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+def comparison(baseline, current, threshold=0.1):
+    """Compares two sets of results.
+
+    Args:
+        baseline: Results considered the reference.
+        current: Results to check.
+        threshold: Relative slowdown of the best time tolerated.
+
+    Returns:
+        List of (name, baseline best, current best, ratio, flag) 5-tuples
+        of the benchmarks in both sets, flag being 'REGRESSION', 'faster',
+        or ''.
+    """
+    rows = []
+
+    for key in sorted(set(baseline) & set(current)):
+        base = baseline[key]['best']
+        cur = current[key]['best']
+
+        ratio = cur/base if base > 0 else 1.0
+
+        flag = ''
+
+        if ratio > 1.0+threshold:
+            flag = 'REGRESSION'
+        elif ratio < 1.0/(1.0+threshold):
+            flag = 'faster'
+
+        rows.append((key, base, cur, ratio, flag))
+
+    return rows
+
+def compare(baseline, current, threshold=0.1):
+    """Returns the names of the benchmarks that regressed, see comparison.
+    """
+    return [row[0] for row in comparison(baseline, current, threshold)
+            if row[4] == 'REGRESSION']
+
+def sizes(value):
+    return [int(x) for x in value.split(',')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='NEAT microbenchmarks')
+
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('-o', '--output', help='JSON file to write')
+    run_parser.add_argument('--pop-sizes', type=sizes, default=[50, 150, 500])
+    run_parser.add_argument('--genome-sizes', type=sizes,
+            default=[6, 50, 200])
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('names', nargs='*',
+            help='benchmarks to run, all by default')
+
+    compare_parser = commands.add_parser('compare',
+            help='compare results against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+
+    logging.getLogger().addHandler(logging.NullHandler())
+
+    if args.command == 'run':
+        results = run(args.pop_sizes, args.genome_sizes, args.repeat,
+                args.names, args.seed)
+
+        for key, result in results.items():
+            print '%-40s %12.3fus' % (key, result['best']*1e6)
+
+        if args.output:
+            save(results, args.output)
+
+        return 0
+
+    baseline, current = load(args.baseline), load(args.current)
+
+    rows = comparison(baseline, current, args.threshold)
+
+    for key, base, cur, ratio, flag in rows:
+        print '%-40s %12.3fus %12.3fus %7.2fx %s' % (key, base*1e6,
+                cur*1e6, ratio, flag)
+
+    for key in sorted(set(baseline) ^ set(current)):
+        print '%-40s only in %s' % (key,
+                'baseline' if key in baseline else 'current')
+
+    return 1 if any(row[4] == 'REGRESSION' for row in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+from collections import OrderedDict
+
+class LRUCache(object):
+    """Least recently used cache.
+
+    Keeps at most size items, evicting the least recently used item when
+    full. A size of zero disables the cache.
+
+    Attributes:
+        size: Maximum number of items.
+        hits: Number of lookups that found an item.
+        misses: Number of lookups that did not find an item.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.__items = OrderedDict()
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __contains__(self, key):
+        return key in self.__items
+
+    def get(self, key, default=None):
+        """Looks up key, marking it as the most recently used."""
+        try:
+            value = self.__items.pop(key)
+        except KeyError:
+            self.misses += 1
+
+            return default
+
+        self.__items[key] = value
+
+        self.hits += 1
+
+        return value
+
+    def put(self, key, value):
+        """Stores value under key, evicting old items if needed."""
+        if self.size <= 0:
+            return
+
+        self.__items.pop(key, None)
+
+        self.__items[key] = value
+
+        self.__trim()
+
+    def resize(self, size):
+        if size != self.size:
+            self.size = size
+
+            self.__trim()
+
+    def clear(self):
+        """Removes every item and resets the counters."""
+        self.__items.clear()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __trim(self):
+        while len(self.__items) > max(self.size, 0):
+            self.__items.popitem(last=False)
@@ -0,0 +1,317 @@
+"""Population checkpoints.
+
+A checkpoint is a compressed numpy archive holding everything needed to
+continue evolution exactly where it stopped: the genes of every genome
+packed into a few arrays, the organisms, species membership, innovation
+tables, and the state of the numpy random number generator.
+
+A checkpoint can be incremental, storing only genomes and innovations that
+are not in a full base checkpoint. Genomes are never changed once they are
+part of a population, so the base stays valid for later generations.
+"""
+from .organism import Organism
+from .species import Species
+from .innovations import GeneInnovation
+from .innovations import NeuronInnovation
+from .genotype import Genome
+
+import os
+import tempfile
+import numpy as np
+
+VERSION = 1
+
+def save(pop, path, base=None, run=1):
+    """Writes checkpoint of population.
+
+    The checkpoint is written to a temporary file that replaces path once
+    complete, so path always holds a complete checkpoint.
+
+    Args:
+        pop: Population to save.
+        path: Destination file.
+        base: Path of a full checkpoint, when given only what is missing
+            from it is stored.
+        run: Run of the experiment the population belongs to.
+    """
+    data = {'version': np.array(VERSION), 'run': np.array(run)}
+
+    known_genomes = set()
+    known_genes = set()
+    known_neurons = set()
+
+    if base:
+        archive = read(base)
+
+        if str(archive['base']):
+            raise ValueError('Base checkpoint %s is incremental' % base)
+
+        known_genomes = set(archive['genome_id'].tolist())
+        known_genes = set(map(tuple,
+            archive['gene_innov'][:, :2].tolist()))
+        known_neurons = set(map(tuple,
+            archive['neuron_innov'][:, :3].tolist()))
+
+        data['base'] = np.array(os.path.relpath(base,
+            os.path.dirname(os.path.abspath(path))))
+    else:
+        data['base'] = np.array('')
+
+    organisms = list(pop.organisms)
+    index = dict((id(o), x) for x, o in enumerate(organisms))
+
+    for s in pop.species:
+        for o in s.organisms:
+            if id(o) not in index:
+                index[id(o)] = len(organisms)
+
+                organisms.append(o)
+
+    data.update(pack_organisms(pop, organisms, index))
+
+    genomes = {}
+
+    for o in organisms:
+        if o.genome.genome_id not in known_genomes:
+            genomes[o.genome.genome_id] = o.genome
+
+    data.update(pack_genomes([genomes[x] for x in sorted(genomes)]))
+
+    data.update(pack_innovations(pop.innovs, known_genes, known_neurons))
+
+    data.update(pack_random())
+
+    directory = os.path.dirname(os.path.abspath(path))
+
+    fd, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **data)
+
+        os.rename(temp, path)
+    except:
+        os.remove(temp)
+
+        raise
+
+def load(pop, path):
+    """Restores population from checkpoint.
+
+    Args:
+        pop: Population to restore into, usually freshly created.
+        path: Checkpoint file.
+    """
+    data = read(path)
+
+    genomes = {}
+    innovations = [data]
+
+    if str(data['base']):
+        base = os.path.join(os.path.dirname(os.path.abspath(path)),
+                str(data['base']))
+
+        base = read(base)
+
+        genomes.update(unpack_genomes(base))
+
+        innovations.insert(0, base)
+
+    genomes.update(unpack_genomes(data))
+
+    unpack_organisms(pop, data, genomes)
+
+    unpack_innovations(pop.innovs, data['counters'], innovations)
+
+    unpack_random(data)
+
+def read(path):
+    """Reads checkpoint.
+
+    Returns:
+        Dict of the arrays of the checkpoint.
+    """
+    with np.load(path) as archive:
+        data = dict(archive.items())
+
+    version = int(data['version'])
+
+    if version != VERSION:
+        raise ValueError('Unsupported checkpoint version %d' % version)
+
+    return data
+
+def info(path):
+    """Returns 2-tuple of the run and generation of a checkpoint."""
+    with np.load(path) as archive:
+        return int(archive['run']), int(archive['generation'])
+
+def pack_organisms(pop, organisms, index):
+    species = pop.species
+
+    return {
+            'generation': np.array(pop.generation),
+            'population': np.array([index[id(o)] for o in pop.organisms],
+                dtype=np.int64),
+            'organism_genome': np.array([o.genome.genome_id
+                for o in organisms], dtype=np.int64),
+            'organism_fitness': np.array([o.fitness for o in organisms],
+                dtype=float),
+            'organism_rank': np.array([o.rank for o in organisms],
+                dtype=np.int64),
+            'organism_flags': np.array([(o.marked, o.winner)
+                for o in organisms], dtype=bool).reshape((-1, 2)),
+            'species_id': np.array([s.species_id for s in species],
+                dtype=np.int64),
+            'species_fitness': np.array([(s.max_fitness, s.avg_fitness)
+                for s in species], dtype=float).reshape((-1, 2)),
+            'species_counters': np.array([(s.age_since_imp, s.offspring)
+                for s in species], dtype=np.int64).reshape((-1, 2)),
+            'species_marked': np.array([s.marked for s in species],
+                dtype=bool),
+            'species_size': np.array([len(s.organisms) for s in species],
+                dtype=np.int64),
+            'species_members': np.array([index[id(o)] for s in species
+                for o in s.organisms], dtype=np.int64),
+            }
+
+def unpack_organisms(pop, data, genomes):
+    organisms = []
+
+    for x in xrange(len(data['organism_genome'])):
+        o = Organism(genomes[int(data['organism_genome'][x])])
+
+        o.fitness = float(data['organism_fitness'][x])
+        o.rank = int(data['organism_rank'][x])
+        o.marked = bool(data['organism_flags'][x, 0])
+        o.winner = bool(data['organism_flags'][x, 1])
+
+        organisms.append(o)
+
+    pop.generation = int(data['generation'])
+    pop.organisms = [organisms[x] for x in data['population'].tolist()]
+    pop.species = []
+
+    members = data['species_members'].tolist()
+    offset = 0
+
+    for x in xrange(len(data['species_id'])):
+        s = Species(int(data['species_id'][x]))
+
+        s.max_fitness = float(data['species_fitness'][x, 0])
+        s.avg_fitness = float(data['species_fitness'][x, 1])
+        s.age_since_imp = int(data['species_counters'][x, 0])
+        s.offspring = int(data['species_counters'][x, 1])
+        s.marked = bool(data['species_marked'][x])
+
+        size = int(data['species_size'][x])
+
+        s.organisms = [organisms[y] for y in members[offset:offset+size]]
+
+        offset += size
+
+        pop.species.append(s)
+
+def pack_genomes(genomes):
+    activations = [(x, n, a) for x, g in enumerate(genomes)
+            for n, a in sorted(g.activations.items())]
+
+    return {
+            'genome_id': np.array([g.genome_id for g in genomes],
+                dtype=np.int64),
+            'genome_neurons': np.array([g.neurons for g in genomes],
+                dtype=np.int64).reshape((-1, 3)),
+            'genome_size': np.array([len(g.innovs) for g in genomes],
+                dtype=np.int64),
+            'genome_activations': np.array(activations,
+                dtype=np.int64).reshape((-1, 3)),
+            'inodes': concatenate([g.inodes for g in genomes], np.int64),
+            'onodes': concatenate([g.onodes for g in genomes], np.int64),
+            'weights': concatenate([g.weights for g in genomes], float),
+            'innovs': concatenate([g.innovs for g in genomes], np.int64),
+            'enabled': concatenate([g.enabled for g in genomes], bool),
+            }
+
+def unpack_genomes(data):
+    genomes = {}
+
+    offsets = np.concatenate(([0], np.cumsum(data['genome_size'])))
+
+    activations = {}
+
+    for x, n, a in data['genome_activations'].tolist():
+        activations.setdefault(x, {})[n] = a
+
+    for x in xrange(len(data['genome_id'])):
+        start, end = offsets[x], offsets[x+1]
+
+        genome = Genome.from_arrays(int(data['genome_id'][x]),
+                data['genome_neurons'][x].tolist(),
+                data['inodes'][start:end].copy(),
+                data['onodes'][start:end].copy(),
+                data['weights'][start:end].copy(),
+                data['innovs'][start:end].copy(),
+                data['enabled'][start:end].copy(),
+                activations.get(x))
+
+        genomes[genome.genome_id] = genome
+
+    return genomes
+
+def pack_innovations(innovs, known_genes, known_neurons):
+    genes = [(x.inode, x.onode, x.innov, x.weight)
+            for k, x in innovs.gene_innov.items() if k not in known_genes]
+    neurons = [(x.inode, x.onode, x.old_innov, x.innov1, x.innov2,
+        x.neuron, x.weight) for k, x in innovs.neuron_innov.items()
+        if k not in known_neurons]
+
+    return {
+            'counters': np.array([innovs.innov, innovs.neuron,
+                innovs.genome, innovs.species], dtype=np.int64),
+            'gene_innov': np.array([x[:3] for x in genes],
+                dtype=np.int64).reshape((-1, 3)),
+            'gene_weight': np.array([x[3] for x in genes], dtype=float),
+            'neuron_innov': np.array([x[:6] for x in neurons],
+                dtype=np.int64).reshape((-1, 6)),
+            'neuron_weight': np.array([x[6] for x in neurons], dtype=float),
+            }
+
+def unpack_innovations(innovs, counters, archives):
+    innovs.innov, innovs.neuron, innovs.genome, innovs.species = \
+            counters.tolist()
+
+    innovs.gene_innov = {}
+    innovs.neuron_innov = {}
+
+    for data in archives:
+        for (inode, onode, innov), weight in zip(
+                data['gene_innov'].tolist(), data['gene_weight'].tolist()):
+            innovs.gene_innov[(inode, onode)] = GeneInnovation(inode, onode,
+                    weight, innov)
+
+        for (inode, onode, old, innov1, innov2, neuron), weight in zip(
+                data['neuron_innov'].tolist(),
+                data['neuron_weight'].tolist()):
+            innovs.neuron_innov[(inode, onode, old)] = NeuronInnovation(
+                    inode, onode, weight, old, innov1, innov2, neuron)
+
+def pack_random():
+    name, keys, pos, has_gauss, cached = np.random.get_state()
+
+    return {
+            'numpy_state': keys,
+            'numpy_meta': np.array([pos, has_gauss], dtype=np.int64),
+            'numpy_gauss': np.array(cached),
+            }
+
+def unpack_random(data):
+    pos, has_gauss = data['numpy_meta'].tolist()
+
+    np.random.set_state(('MT19937', data['numpy_state'], pos, has_gauss,
+        float(data['numpy_gauss'])))
+
+def concatenate(arrays, dtype):
+    if not arrays:
+        return np.zeros(0, dtype=dtype)
+
+    return np.concatenate(arrays).astype(dtype)
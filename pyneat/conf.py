@@ -41,6 +41,37 @@ class Conf(object):
         self.runs = kwargs.get('runs', 1)
         self.allow_recurrent = kwargs.get('allow_recurrent', False)
         self.clamp_weights = kwargs.get('clamp_weights', 0)
+        self.workers = kwargs.get('workers', 1)
+        self.chunksize = kwargs.get('chunksize', 0)
+        self.phenotype_cache_size = kwargs.get('phenotype_cache_size', 1024)
+        self.engine = kwargs.get('engine', 'dense')
+        self.sparse_density = kwargs.get('sparse_density', 0.1)
+        self.sparse_min_hidden = kwargs.get('sparse_min_hidden', 50)
+        self.compile_threshold = kwargs.get('compile_threshold', 32)
+        self.checkpoint_interval = kwargs.get('checkpoint_interval', 0)
+        self.checkpoint_dir = kwargs.get('checkpoint_dir', '.')
+        self.checkpoint_full_interval = kwargs.get(
+                'checkpoint_full_interval', 1)
+        self.batch_fitness = kwargs.get('batch_fitness', False)
+        self.fitness_cache_size = kwargs.get('fitness_cache_size', 0)
+        self.fitness_cache_precision = kwargs.get(
+                'fitness_cache_precision', 1e-9)
+        self.parallel_runs = kwargs.get('parallel_runs', 1)
+        self.seed = kwargs.get('seed', None)
+        self.islands = kwargs.get('islands', 1)
+        self.migration_interval = kwargs.get('migration_interval', 5)
+        self.migration_size = kwargs.get('migration_size', 2)
+        self.migration_topology = kwargs.get('migration_topology', 'ring')
+        self.innovation_mode = kwargs.get('innovation_mode', 'sequential')
+        self.reproduction_workers = kwargs.get('reproduction_workers', 1)
 
     def to_json(self):
-        return json.dumps(self.__dict__)
+        return json.dumps(self.__dict__, default=Conf.__function_path)
+
+    @staticmethod
+    def __function_path(value):
+        """Serializes a callable fitness_func as its module path."""
+        if callable(value):
+            return '%s:%s' % (value.__module__, value.__name__)
+
+        raise TypeError('%r is not JSON serializable' % (value,))
@@ -1,6 +1,70 @@
 from abc import ABCMeta
 from abc import abstractmethod
 from datetime import datetime
+from collections import namedtuple
+
+import Queue
+import logging
+import threading
+import numpy as np
+
+SpeciesRecord = namedtuple('SpeciesRecord',
+        ['species_id', 'max_fitness', 'avg_fitness', 'age_since_imp',
+            'offspring', 'marked', 'fitness', 'genome_ids'])
+
+class SpeciesSnapshot(object):
+    """Snapshot of the species of a generation.
+
+    Copies the data observers need out of the live Species objects into
+    plain arrays, so it can be handed to another thread while evolution
+    keeps changing the species. Iterating yields a SpeciesRecord per
+    species.
+
+    Attributes:
+        species_id: Id of each species.
+        max_fitness: Max fitness of each species.
+        avg_fitness: Average fitness of each species.
+        age_since_imp: Generations since each species improved.
+        offspring: Offspring assigned to each species.
+        marked: Whether each species is marked for removal.
+        size: Number of organisms in each species.
+        fitness: Fitness of every organism, grouped by species.
+        genome_ids: Genome id of every organism, grouped by species.
+    """
+    def __init__(self, species):
+        self.species_id = np.array([s.species_id for s in species],
+                dtype=int)
+        self.max_fitness = np.array([s.max_fitness for s in species],
+                dtype=float)
+        self.avg_fitness = np.array([s.avg_fitness for s in species],
+                dtype=float)
+        self.age_since_imp = np.array([s.age_since_imp for s in species],
+                dtype=int)
+        self.offspring = np.array([s.offspring for s in species], dtype=int)
+        self.marked = np.array([s.marked for s in species], dtype=bool)
+        self.size = np.array([len(s.organisms) for s in species], dtype=int)
+        self.fitness = np.array([o.fitness for s in species
+            for o in s.organisms], dtype=float)
+        self.genome_ids = np.array([o.genome.genome_id for s in species
+            for o in s.organisms], dtype=int)
+
+    def __len__(self):
+        return len(self.species_id)
+
+    def __iter__(self):
+        offsets = np.concatenate(([0], np.cumsum(self.size)))
+
+        for x in xrange(len(self)):
+            start, end = offsets[x], offsets[x+1]
+
+            yield SpeciesRecord(int(self.species_id[x]),
+                    float(self.max_fitness[x]),
+                    float(self.avg_fitness[x]),
+                    int(self.age_since_imp[x]),
+                    int(self.offspring[x]),
+                    bool(self.marked[x]),
+                    self.fitness[start:end],
+                    self.genome_ids[start:end])
 
 class DataObserver(object):
     __metaclass__ = ABCMeta
@@ -25,29 +89,182 @@ class DataObserver(object):
     def progress(self, progress, message):
         pass
 
+    def fitness_cache(self, hits, misses):
+        """Called after each generation is evaluated with a fitness cache.
+
+        Args:
+            hits: Organisms whose fitness was found in the cache.
+            misses: Organisms that had to be evaluated.
+        """
+        pass
+
+    def epoch_stats(self, stats):
+        """Called at the end of each population epoch.
+
+        Args:
+            stats: EpochStats of the generation.
+        """
+        pass
+
+    def flush(self):
+        """Called after each batch of events when the logger is queued."""
+        pass
+
 class DataLogger(object):
-    def __init__(self):
+    """Notifies observers of experiment events.
+
+    By default observers are called synchronously. A queued logger instead
+    puts events on a bounded queue consumed by a background thread, so
+    evolution does not wait on slow observers. Generations are passed to
+    queued observers as a SpeciesSnapshot rather than the live species.
+    The thread handles up to batch_size pending events at a time before
+    calling flush on the observers. Evolution only blocks when max_pending
+    events are waiting, and notify_experiment_end waits until every event
+    has been delivered.
+
+    Attributes:
+        queued: Whether events are delivered by a background thread.
+        max_pending: Maximum events waiting to be delivered.
+        batch_size: Maximum events delivered between flushes.
+    """
+    def __init__(self, queued=False, max_pending=256, batch_size=32):
         self.__observers = []
+        self.queued = queued
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.__queue = None
+        self.__thread = None
+        self.__error = None
+        self.log = logging.getLogger('datalogger')
 
     def add_observer(self, observer):
         self.__observers.append(observer)
 
-    def notify_experiment(self, name, conf, dt=datetime.now()):
-        for o in self.__observers:
-            o.experiment(name, conf, dt)
+    def notify_experiment(self, name, conf, dt=None):
+        self.__dispatch('experiment', name, conf, dt or datetime.now())
 
-    def notify_experiment_end(self, dt=datetime.now()):
-        for o in self.__observers:
-            o.experiment_end(dt)
+    def notify_experiment_end(self, dt=None):
+        self.__dispatch('experiment_end', dt or datetime.now())
+
+        if self.queued:
+            self.__stop()
 
     def notify_population(self, pop_index):
-        for o in self.__observers:
-            o.population(pop_index)
+        self.__dispatch('population', pop_index)
 
     def notify_generation(self, gen_index, species):
-        for o in self.__observers:
-            o.generation(gen_index, species)
+        if self.queued and not isinstance(species, SpeciesSnapshot):
+            species = SpeciesSnapshot(species)
+
+        self.__dispatch('generation', gen_index, species)
 
     def notify_progress(self, progress=None, message=None):
+        self.__dispatch('progress', progress, message)
+
+    def notify_fitness_cache(self, hits, misses):
+        self.__dispatch('fitness_cache', hits, misses)
+
+    def notify_epoch_stats(self, stats):
+        self.__dispatch('epoch_stats', stats)
+
+    def __dispatch(self, event, *args):
+        if not self.queued:
+            for o in self.__observers:
+                getattr(o, event)(*args)
+
+            return
+
+        if self.__thread is None:
+            self.__start()
+
+        self.__queue.put((event, args))
+
+    def __start(self):
+        self.__queue = Queue.Queue(self.max_pending)
+        self.__error = None
+
+        self.__thread = threading.Thread(target=self.__write,
+                name='datalogger')
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __stop(self):
+        """Waits for every queued event to be delivered."""
+        if self.__thread is None:
+            return
+
+        self.__queue.put(None)
+
+        self.__thread.join()
+
+        self.__thread = None
+
+        error, self.__error = self.__error, None
+
+        if error is not None:
+            raise error
+
+    def __write(self):
+        done = False
+
+        while not done:
+            batch = [self.__queue.get()]
+
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.__queue.get_nowait())
+            except Queue.Empty:
+                pass
+
+            for item in batch:
+                if item is None:
+                    done = True
+
+                    break
+
+                event, args = item
+
+                self.__deliver(event, args)
+
+            self.__deliver('flush', ())
+
+    def __deliver(self, event, args):
         for o in self.__observers:
-            o.progress(progress, message)
+            try:
+                getattr(o, event)(*args)
+            except Exception as e:
+                self.log.exception('observer failed handling %s', event)
+
+                if self.__error is None:
+                    self.__error = e
+
+class DataRecorder(object):
+    """Records notifications to replay them into a DataLogger later.
+
+    Stands in for a DataLogger where observers cannot be reached, such as
+    a run performed in another process. Generations are recorded as
+    SpeciesSnapshot objects so the recording can be pickled.
+    """
+    def __init__(self):
+        self.events = []
+
+    def notify_population(self, pop_index):
+        self.events.append(('notify_population', (pop_index,)))
+
+    def notify_generation(self, gen_index, species):
+        self.events.append(('notify_generation',
+            (gen_index, SpeciesSnapshot(species))))
+
+    def notify_progress(self, progress=None, message=None):
+        self.events.append(('notify_progress', (progress, message)))
+
+    def notify_fitness_cache(self, hits, misses):
+        self.events.append(('notify_fitness_cache', (hits, misses)))
+
+    def notify_epoch_stats(self, stats):
+        self.events.append(('notify_epoch_stats', (stats,)))
+
+    def replay(self, logger):
+        """Sends the recorded notifications to logger in order."""
+        for event, args in self.events:
+            getattr(logger, event)(*args)
@@ -0,0 +1,306 @@
+from .genotype import Genome
+from .cache import LRUCache
+
+import re
+import math
+import logging
+import importlib
+import itertools
+import multiprocessing
+import numpy as np
+
+# "module:function" path of a fitness method
+FITNESS_PATH = re.compile(r'^[\w.]+:\w+$')
+
+def load_fitness(fitness_func):
+    """Compiles fitness method.
+
+    Args:
+        fitness_func: Source of the fitness method. See Experiment.
+
+    Returns:
+        Namespace the fitness method was executed in.
+    """
+    ns = {'math': math, 'np': np}
+
+    exec fitness_func in ns
+
+    return ns
+
+def fitness_function(fitness_func, name):
+    """Resolves fitness method.
+
+    Args:
+        fitness_func: Either a callable, a "module:function" path, or the
+            source of the fitness method. See Experiment.
+        name: Name of the method to take from the source.
+
+    Returns:
+        The fitness method.
+    """
+    if callable(fitness_func):
+        return fitness_func
+
+    if FITNESS_PATH.match(fitness_func.strip()):
+        module, func = fitness_func.strip().split(':', 1)
+
+        return getattr(importlib.import_module(module), func)
+
+    return load_fitness(fitness_func)[name]
+
+def fitness_name(conf):
+    """Name of the fitness method, depending on the protocol in use."""
+    return 'evaluate_population' if conf.batch_fitness else 'evaluate'
+
+def create_evaluator(conf):
+    """Creates evaluator described by conf.
+
+    Uses a pool of conf.workers processes when more than one worker is
+    requested otherwise organisms are evaluated in this process. Sizes the
+    phenotype template cache, see Genome.genesis, before the pool starts
+    so its processes inherit the size.
+    """
+    Genome.templates.resize(conf.phenotype_cache_size)
+
+    if conf.workers > 1:
+        evaluator = ParallelEvaluator(conf)
+    elif conf.batch_fitness:
+        evaluator = BatchEvaluator(conf)
+    else:
+        evaluator = SerialEvaluator(conf)
+
+    if conf.fitness_cache_size > 0:
+        logging.getLogger('evaluator').info('caching fitness of up to %d '
+                'networks, the fitness method must be deterministic',
+                conf.fitness_cache_size)
+
+        evaluator = CachedEvaluator(evaluator, conf.fitness_cache_size,
+                conf.fitness_cache_precision)
+
+    return evaluator
+
+class SerialEvaluator(object):
+    """Evaluates genomes one after another in the current process.
+    """
+    def __init__(self, conf):
+        self.conf = conf
+        self.evaluate_func = fitness_function(conf.fitness_func, 'evaluate')
+
+    def evaluate(self, genomes):
+        """Evaluates genomes.
+
+        Args:
+            genomes: List of genomes.
+
+        Returns:
+            Iterator of (fitness, winner) 2-tuples in the order of genomes.
+        """
+        for g in genomes:
+            yield self.evaluate_func(g.genesis(self.conf))
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+def evaluate_batch(evaluate_func, genomes, conf):
+    """Evaluates genomes with a population fitness method.
+
+    Args:
+        evaluate_func: evaluate_population method, see Experiment.
+        genomes: List of genomes.
+        conf: Instance of Conf class.
+
+    Returns:
+        List of (fitness, winner) 2-tuples in the order of genomes.
+    """
+    if not genomes:
+        return []
+
+    fitness, winner = evaluate_func(Genome.batch_genesis(genomes, conf))
+
+    fitness = np.asarray(fitness, dtype=float).ravel()
+    winner = np.asarray(winner, dtype=bool).ravel()
+
+    if len(fitness) != len(genomes) or len(winner) != len(genomes):
+        raise ValueError('evaluate_population returned %d fitness and %d '
+                'winner values for %d genomes' % (len(fitness), len(winner),
+                    len(genomes)))
+
+    return zip(fitness.tolist(), winner.tolist())
+
+class BatchEvaluator(object):
+    """Evaluates every genome with one call to evaluate_population.
+
+    The genomes are packed into a single BatchNeuralNetwork, see
+    Genome.batch_genesis, so the fitness method can score all of them
+    with a few array operations.
+    """
+    def __init__(self, conf):
+        self.conf = conf
+        self.evaluate_func = fitness_function(conf.fitness_func,
+                'evaluate_population')
+
+    def evaluate(self, genomes):
+        """Evaluates genomes.
+
+        Args:
+            genomes: List of genomes.
+
+        Returns:
+            Iterator of (fitness, winner) 2-tuples in the order of genomes.
+        """
+        return iter(evaluate_batch(self.evaluate_func, genomes, self.conf))
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+# Conf and fitness method of a pool worker, set once by _init_worker.
+_conf = None
+_evaluate_func = None
+
+def _init_worker(conf):
+    global _conf, _evaluate_func
+
+    _conf = conf
+    _evaluate_func = fitness_function(conf.fitness_func, fitness_name(conf))
+
+def _evaluate_genome(genome):
+    return _evaluate_func(genome.genesis(_conf))
+
+def _evaluate_genomes(genomes):
+    return evaluate_batch(_evaluate_func, genomes, _conf)
+
+class ParallelEvaluator(object):
+    """Evaluates genomes using a pool of processes.
+
+    Every worker compiles the fitness method once when it starts. Genomes
+    are dispatched in chunks and the results are returned in the same order
+    as the genomes, so the outcome does not depend on scheduling. With
+    conf.batch_fitness each chunk is evaluated as one batch.
+
+    Attributes:
+        workers: Number of worker processes.
+        chunksize: Number of genomes sent to a worker at once, when 0 it is
+            derived from the number of genomes.
+    """
+    def __init__(self, conf):
+        self.workers = conf.workers
+        self.chunksize = conf.chunksize
+        self.batch = conf.batch_fitness
+        self.pool = multiprocessing.Pool(self.workers, _init_worker, (conf,))
+        self.log = logging.getLogger('evaluator')
+
+    def evaluate(self, genomes):
+        """Evaluates genomes.
+
+        Args:
+            genomes: List of genomes.
+
+        Returns:
+            Iterator of (fitness, winner) 2-tuples in the order of genomes.
+        """
+        chunksize = self.chunksize
+
+        if not chunksize:
+            chunksize = max(1, len(genomes)//(self.workers*4))
+
+        if self.batch:
+            chunks = [genomes[x:x+chunksize]
+                    for x in xrange(0, len(genomes), chunksize)]
+
+            return itertools.chain.from_iterable(
+                    self.pool.imap(_evaluate_genomes, chunks))
+
+        return self.pool.imap(_evaluate_genome, genomes, chunksize)
+
+    def cancel(self):
+        """Cancels outstanding evaluations and stops the workers."""
+        self.log.info('cancelling outstanding evaluations')
+
+        self.pool.terminate()
+        self.pool.join()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+class CachedEvaluator(object):
+    """Remembers the fitness of genomes.
+
+    Wraps another evaluator and only passes it genomes whose network has
+    not been evaluated before, see Genome.fitness_key. This skips the
+    champions carried over by each species and children identical to a
+    genome already seen, including duplicates within a generation. Only
+    valid when the fitness method is deterministic.
+
+    Attributes:
+        evaluator: Evaluator of genomes missing from the cache.
+        cache: LRUCache of (fitness, winner) 2-tuples.
+        precision: Weight quantization step, see Genome.fitness_key.
+        hits: Genomes of the last evaluate served without evaluating them.
+        misses: Genomes of the last evaluate that were evaluated.
+    """
+    def __init__(self, evaluator, size, precision=0.0):
+        self.evaluator = evaluator
+        self.cache = LRUCache(size)
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+
+    def evaluate(self, genomes):
+        """Evaluates genomes.
+
+        Args:
+            genomes: List of genomes.
+
+        Returns:
+            Iterator of (fitness, winner) 2-tuples in the order of genomes.
+        """
+        self.hits = 0
+        self.misses = 0
+
+        keys = [g.fitness_key(self.precision) for g in genomes]
+
+        # Results are looked up now so later insertions cannot evict them
+        known = {}
+        missing = []
+
+        for g, k in zip(genomes, keys):
+            if k in known:
+                continue
+
+            result = self.cache.get(k)
+
+            if result is None:
+                missing.append(g)
+
+            known[k] = result
+
+        return self.__results(keys, known,
+                self.evaluator.evaluate(missing))
+
+    def __results(self, keys, known, results):
+        for k in keys:
+            result = known[k]
+
+            if result is None:
+                result = known[k] = next(results)
+
+                self.cache.put(k, result)
+
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            yield result
+
+    def cancel(self):
+        self.evaluator.cancel()
+
+    def close(self):
+        self.evaluator.close()
@@ -1,8 +1,19 @@
 from . import Population
 from .genotype import Genome
-
-import math
+from .evaluator import create_evaluator
+from .evaluator import CachedEvaluator
+from . import checkpoint
+from .datalogger import DataRecorder
+from .island import IslandModel
+
+import os
+import copy
+import random
+import hashlib
 import logging
+import itertools
+import multiprocessing
+import numpy as np
 
 class Experiment(object):
     """Peforms experiment using NEAT.
@@ -38,6 +49,61 @@ class Experiment(object):
 
         return fitness, winner
 
+    For time series and control tasks net.activate_sequence runs a whole
+    (T, num_input) array of inputs, returning the (T, num_output) outputs,
+    and net.reset clears the recurrent state between episodes.
+
+    Instead of source, fitness_func can be the function itself or a
+    "module:function" path. Use the path form with conf.workers greater than
+    one unless the function can be pickled by reference.
+
+    With conf.batch_fitness the fitness method is instead named
+    evaluate_population. It receives a BatchNeuralNetwork holding every
+    network of the generation and returns arrays of fitness values and
+    winner flags in the same order. Source is executed with math and
+    numpy, as np, available.
+
+    e.g.
+
+    def evaluate_population(batch_net):
+        data = ((0.0, 0.0, 1.0),
+                (1.0, 0.0, 1.0),
+                (0.0, 1.0, 1.0),
+                (1.0, 1.0, 1.0))
+
+        res = np.hstack([batch_net.activate(d) for d in data])
+
+        error = np.abs(res-(0.0, 1.0, 1.0, 0.0)).sum(axis=1)
+
+        winner = np.all((res >= 0.5) == (False, True, True, False), axis=1)
+
+        return (4-error)**2, winner
+
+    With conf.workers greater than one the organisms of a generation are
+    evaluated by a pool of processes, see ParallelEvaluator.
+
+    With conf.fitness_cache_size greater than zero fitness values are
+    cached per network, see CachedEvaluator, so organisms identical to one
+    evaluated before are not evaluated again. Only enable it when the
+    fitness method is deterministic.
+
+    With conf.parallel_runs greater than one the runs are performed
+    concurrently, see run_parallel. Setting conf.seed makes every run
+    reproducible, in either mode.
+
+    With conf.islands greater than one each run evolves that many
+    populations in parallel processes, exchanging their fittest organisms,
+    see IslandModel. Islands number their innovations in the order they
+    reach the shared registry, so island runs are not reproducible even
+    with conf.seed set. They do not support content innovations,
+    reproduction workers, or checkpoints.
+
+    With conf.checkpoint_interval greater than zero the population is saved
+    to conf.checkpoint_dir every checkpoint_interval generations. Only every
+    checkpoint_full_interval-th checkpoint is complete, the ones in between
+    store what changed since the last complete one. Passing any of them as
+    resume continues the experiment from that point.
+
     Attributes:
         name: Name of experiment.
         log: Logger for experiment class.
@@ -45,7 +111,7 @@ class Experiment(object):
     def __init__(self):
         self.log = logging.getLogger('experiment')
 
-    def run(self, name, conf, observer=None):
+    def run(self, name, conf, observer=None, resume=None):
         """Runs experiment.
 
         Creates a population where each organism evaluates the given data.
@@ -61,52 +127,258 @@ class Experiment(object):
                 evaluated by the population.
             fitness_func: Fitness method. See class description.
             runs: Number of runs to perform. Defautlts to 1.
+            resume: Path of a checkpoint to continue from, not supported
+                with conf.islands greater than one.
         """
-        genome = Genome.minimal_fully_connected(0, 
-                (conf.num_input, conf.num_output))
+        if conf.islands > 1:
+            if resume or conf.checkpoint_interval > 0:
+                raise ValueError('Checkpoints are not supported with islands')
 
-        ns = {'math': math}
+            if conf.innovation_mode != 'sequential':
+                raise ValueError(
+                        'Content innovations are not supported with islands')
 
-        exec conf.fitness_func in ns
+            if conf.reproduction_workers > 1:
+                raise ValueError(
+                        'Reproduction workers are not supported with islands')
 
         if observer:
             observer.notify_experiment(name, conf)
 
-        step, max_step = 1, conf.runs*conf.generations
+        start_run = checkpoint.info(resume)[0] if resume else 1
 
-        for r in xrange(conf.runs):
-            if observer:
-                observer.notify_population(r+1)
+        runs = range(start_run, conf.runs+1)
+
+        if conf.islands > 1:
+            self.run_islands(conf, runs, observer)
+        elif conf.parallel_runs > 1 and len(runs) > 1:
+            self.run_parallel(name, conf, runs, observer, resume)
+        else:
+            evaluator = create_evaluator(conf)
+
+            try:
+                for r in runs:
+                    if observer:
+                        observer.notify_population(r)
+
+                    if self.run_population(name, conf, r, evaluator,
+                            observer, resume if r == start_run else None):
+                        evaluator.cancel()
+
+                        break
+            finally:
+                evaluator.close()
+
+        if observer:
+            observer.notify_experiment_end()
+
+    def run_population(self, name, conf, run, evaluator, observer=None,
+            resume=None):
+        """Performs a single run.
+
+        Args:
+            name: Name of experiment.
+            conf: Instance of Conf class.
+            run: Index of the run, starting at 1.
+            evaluator: Evaluator of the organisms, see create_evaluator.
+            observer: DataLogger notified of the generations.
+            resume: Path of a checkpoint of this run to continue from.
+
+        Returns:
+            Whether a winner was found.
+        """
+        if resume:
+            pop = Population.load(resume, conf)
+        else:
+            if conf.seed is not None:
+                seed(run_seed(conf.seed, run))
+
+            genome = Genome.minimal_fully_connected(0,
+                    (conf.num_input, conf.num_output))
 
             pop = Population(conf)
 
             pop.spawn(genome)
 
-            for g in xrange(conf.generations):
-                for o in pop.organisms:
-                    winner = False
+        return self.evolve(name, conf, pop, run, evaluator, observer)
 
-                    net = o.genome.genesis()
+    def evolve(self, name, conf, pop, run, evaluator, observer=None):
+        """Evolves population until a winner is found.
 
-                    o.fitness, o.winner = ns['evaluate'](net)
+        See run_population.
+        """
+        step = (run-1)*conf.generations+pop.generation
+        max_step = conf.runs*conf.generations
+
+        base = None
+
+        for g in xrange(pop.generation-1, conf.generations):
+            results = evaluator.evaluate([o.genome for o in pop.organisms])
+
+            for o, result in itertools.izip(pop.organisms, results):
+                o.fitness, o.winner = result
+
+                if o.winner:
+                    if observer:
+                        observer.notify_generation(pop.generation, pop.species)
+
+                    self.log.info('Winner!!')
 
-                    if o.winner:
-                        if observer:
-                            observer.notify_generation(pop.generation, pop.species)
-                            observer.notify_experiment_end()
+                    return True
 
-                        self.log.info('Winner!!')
+            if observer and isinstance(evaluator, CachedEvaluator):
+                observer.notify_fitness_cache(evaluator.hits,
+                        evaluator.misses)
+
+            pop.epoch(observer)
+
+            base = self.checkpoint(name, conf, pop, run, base)
+
+            progress = round(float(step)*100/float(max_step), 2)
+
+            if observer:
+                observer.notify_progress(progress=progress)
 
-                        return
+            step += 1
 
-                pop.epoch(observer)
+        return False
 
-                progress = round(float(step)*100/float(max_step), 2)
+    def run_islands(self, conf, runs, observer=None):
+        """Performs runs using the island model, see IslandModel.
 
+        Runs are performed one after another, the islands of a run are
+        numbered (run-1)*conf.islands+island for notify_population.
+        Checkpoints are not supported, and runs are not reproducible, see
+        IslandModel.
+
+        Args:
+            conf: Instance of Conf class.
+            runs: Indexes of the runs to perform.
+            observer: DataLogger notified of the generations.
+        """
+        base_seed = conf.seed
+
+        if base_seed is None:
+            base_seed = random.SystemRandom().randint(0, 2**31)
+
+        model = IslandModel(conf)
+
+        for r in runs:
+            winner = model.run(run_seed(base_seed, r), observer,
+                    (r-1)*conf.generations+1, (r-1)*conf.islands)
+
+            if winner is not None:
+                self.log.info('Winner!!')
+
+                return
+
+    def run_parallel(self, name, conf, runs, observer=None, resume=None):
+        """Performs runs concurrently, one process per run.
+
+        Each run is seeded from conf.seed and its index, or from a random
+        seed when conf.seed is None, and evaluates its organisms serially.
+        The events of each run are recorded in its process and replayed
+        into observer in run order. As with sequential runs, the runs after
+        the first one finding a winner are discarded.
+
+        Args:
+            name: Name of experiment.
+            conf: Instance of Conf class.
+            runs: Indexes of the runs to perform.
+            observer: DataLogger notified of the generations.
+            resume: Path of a checkpoint of the first run to continue from.
+        """
+        base_seed = conf.seed
+
+        if base_seed is None:
+            base_seed = random.SystemRandom().randint(0, 2**31)
+
+        tasks = [(name, conf, r, base_seed, resume if x == 0 else None)
+                for x, r in enumerate(runs)]
+
+        pool = multiprocessing.Pool(min(conf.parallel_runs, len(runs)))
+
+        try:
+            for r, winner, recorder in pool.imap(_run_worker, tasks):
                 if observer:
-                    observer.notify_progress(progress=progress)
+                    observer.notify_population(r)
 
-                step += 1
+                    recorder.replay(observer)
 
-        if observer:
-            observer.notify_experiment_end()
+                if winner:
+                    self.log.info('run %d found a winner, stopping', r)
+
+                    pool.terminate()
+
+                    break
+            else:
+                pool.close()
+        except:
+            pool.terminate()
+
+            raise
+        finally:
+            pool.join()
+
+    def checkpoint(self, name, conf, pop, run, base):
+        """Saves checkpoint when due.
+
+        Args:
+            name: Name of experiment.
+            conf: Instance of Conf class.
+            pop: Population to save.
+            run: Current run.
+            base: Path of the last complete checkpoint of this run.
+
+        Returns:
+            Path of the last complete checkpoint.
+        """
+        interval = conf.checkpoint_interval
+
+        completed = pop.generation-1
+
+        if interval <= 0 or completed % interval != 0:
+            return base
+
+        path = os.path.join(conf.checkpoint_dir, '%s-run%d-gen%d.npz' %
+                (name, run, completed))
+
+        if base is None or (completed/interval) % \
+                max(1, conf.checkpoint_full_interval) == 0:
+            pop.save(path, run=run)
+
+            base = path
+        else:
+            pop.save(path, base, run)
+
+        self.log.info('saved checkpoint %s', path)
+
+        return base
+
+def run_seed(seed, run):
+    """Derives the seed of a run from the seed of the experiment."""
+    return int(hashlib.sha1('%d:%d' % (seed, run)).hexdigest()[:8], 16)
+
+def seed(value):
+    np.random.seed(value)
+
+def _run_worker(task):
+    name, conf, run, base_seed, resume = task
+
+    # Pool processes cannot start pools of their own
+    conf = copy.copy(conf)
+    conf.workers = 1
+    conf.reproduction_workers = 1
+    conf.seed = base_seed
+
+    recorder = DataRecorder()
+
+    evaluator = create_evaluator(conf)
+
+    try:
+        winner = Experiment().run_population(name, conf, run, evaluator,
+                recorder, resume)
+    finally:
+        evaluator.close()
+
+    return run, winner, recorder
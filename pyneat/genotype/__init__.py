@@ -1,2 +1,3 @@
 from gene import Gene
+from gene import GeneView
 from genome import Genome
@@ -16,3 +16,69 @@ class Gene(object):
         self.weight = weight
         self.innov = innov
         self.enabled = True
+
+class GeneView(object):
+    """View of a gene stored in a genomes arrays.
+
+    Behaves like a Gene, reading and writing the attributes of the gene at
+    index in the arrays of genome.
+
+    Args:
+        genome: genome storing the gene
+        index: index of the gene in the genomes arrays
+    """
+    __slots__ = ('genome', 'index')
+
+    def __init__(self, genome, index):
+        self.genome = genome
+        self.index = index
+
+    @property
+    def inode(self):
+        return int(self.genome.inodes[self.index])
+
+    @inode.setter
+    def inode(self, value):
+        self.genome.inodes[self.index] = value
+
+        self.genome.invalidate()
+
+    @property
+    def onode(self):
+        return int(self.genome.onodes[self.index])
+
+    @onode.setter
+    def onode(self, value):
+        self.genome.onodes[self.index] = value
+
+        self.genome.invalidate()
+
+    @property
+    def weight(self):
+        return float(self.genome.weights[self.index])
+
+    @weight.setter
+    def weight(self, value):
+        self.genome.weights[self.index] = value
+
+        self.genome.invalidate()
+
+    @property
+    def innov(self):
+        return int(self.genome.innovs[self.index])
+
+    @innov.setter
+    def innov(self, value):
+        self.genome.innovs[self.index] = value
+
+        self.genome.invalidate()
+
+    @property
+    def enabled(self):
+        return bool(self.genome.enabled[self.index])
+
+    @enabled.setter
+    def enabled(self, value):
+        self.genome.enabled[self.index] = value
+
+        self.genome.invalidate()
@@ -1,9 +1,17 @@
 from . import Gene
+from . import GeneView
 from ..ann import RecurrentNeuralNetwork as RNN
-
-import copy
-import math
-import random
+from ..ann import BatchNeuralNetwork as BatchRNN
+from ..ann import SparseNeuralNetwork as SparseRNN
+from ..ann import FeedForwardNeuralNetwork as FFNN
+from ..ann import CompiledNeuralNetwork as CompiledRNN
+from ..ann import CompiledFeedForwardNetwork as CompiledFFNN
+from ..ann import activation
+from ..cache import LRUCache
+from .. import stats
+
+import hashlib
+import numpy as np
 
 class Genome(object):
     """Genotype of an ANN.
@@ -13,17 +21,84 @@ class Genome(object):
     the weights of links in the network. The genotype is used to produce
     the phenotype of a network.
 
+    Genes are stored as parallel arrays, one element per gene, rather than
+    as Gene objects. The genes attribute provides GeneView objects for code
+    that wants to handle genes one at a time. Every random decision of the
+    mutation and crossover operators is drawn from np.random.
+
     Attributes:
         neurons: 3-tuple input, hidden, and output neurons 
-        genes: list of genes describing the links between neurons
+        genes: tuple of views of the genes describing the links between
+            neurons
+        activations: dict mapping neuron to activation id, neurons not
+            present use DEFAULT_ACTIVATION
+        inodes: in node of each gene
+        onodes: out node of each gene
+        weights: weight of each gene
+        innovs: innovation id of each gene
+        enabled: whether each gene is enabled
     """
 
-    MAX_HIDDEN = 1000
+    # Hidden neurons are below MAX_HIDDEN, outputs start at it. Leaves
+    # room for the 60 bit neuron ids of ContentInnovations.
+    MAX_HIDDEN = 2**62
+
+    DEFAULT_ACTIVATION = activation.SIGMOID
 
-    def __init__(self, genome_id, neurons, genes):
+    # Phenotype templates shared by every genome, see genesis. Sized from
+    # conf.phenotype_cache_size by create_evaluator.
+    templates = LRUCache(1024)
+
+    ENGINES = {
+            'dense': RNN,
+            'sparse': SparseRNN,
+            'feedforward': FFNN,
+            'compiled': CompiledRNN,
+            'compiled_feedforward': CompiledFFNN,
+            }
+
+    def __init__(self, genome_id, neurons, genes, activations=None):
         self.genome_id = genome_id
         self.neurons = neurons
-        self.genes = genes
+        self.activations = activations if activations else {}
+        self.inodes = np.array([g.inode for g in genes], dtype=np.int64)
+        self.onodes = np.array([g.onode for g in genes], dtype=np.int64)
+        self.weights = np.array([g.weight for g in genes], dtype=float)
+        self.innovs = np.array([g.innov for g in genes], dtype=np.int64)
+        self.enabled = np.array([g.enabled for g in genes], dtype=bool)
+        self.__compat = None
+
+    @classmethod
+    def from_arrays(cls, genome_id, neurons, inodes, onodes, weights, innovs,
+            enabled, activations=None):
+        """Creates genome from gene arrays.
+
+        The arrays are used as is, not copied.
+        """
+        genome = cls(genome_id, neurons, [], activations)
+
+        genome.inodes = inodes
+        genome.onodes = onodes
+        genome.weights = weights
+        genome.innovs = innovs
+        genome.enabled = enabled
+
+        return genome
+
+    @property
+    def genes(self):
+        """Tuple of views of the genes, use add_gene to add one."""
+        return tuple(GeneView(self, x) for x in xrange(len(self.innovs)))
+
+    def add_gene(self, gene):
+        """Appends copy of gene to the genome."""
+        self.inodes = np.append(self.inodes, gene.inode)
+        self.onodes = np.append(self.onodes, gene.onode)
+        self.weights = np.append(self.weights, gene.weight)
+        self.innovs = np.append(self.innovs, gene.innov)
+        self.enabled = np.append(self.enabled, gene.enabled)
+
+        self.invalidate()
 
     @classmethod
     def minimal_fully_connected(cls, genome_id, neurons):
@@ -35,16 +110,16 @@ class Genome(object):
         Args:
             neurons: 2-tuple input, and output neurons
         """
-        innov = 0
-        genes = []
-
-        for i in xrange(neurons[0]):
-            for o in xrange(neurons[1]):
-                genes.append(Gene(i, Genome.MAX_HIDDEN+o, 1.0, innov))
+        total = neurons[0]*neurons[1]
 
-                innov += 1
-
-        return cls(genome_id, [neurons[0], 0, neurons[1]], genes)
+        return cls.from_arrays(genome_id,
+                [neurons[0], 0, neurons[1]],
+                np.repeat(np.arange(neurons[0], dtype=np.int64), neurons[1]),
+                np.tile(np.arange(neurons[1], dtype=np.int64), neurons[0])+
+                    Genome.MAX_HIDDEN,
+                np.ones(total),
+                np.arange(total, dtype=np.int64),
+                np.ones(total, dtype=bool))
 
     def duplicate(self, genome_id):
         """Duplicates genome.
@@ -53,11 +128,18 @@ class Genome(object):
             genome_id: new genomes id.
 
         Returns:
-            Deep copy of current genome, with a new id.
+            Copy of current genome, with a new id.
         """
-        genome = copy.deepcopy(self)
+        genome = Genome.from_arrays(genome_id,
+                list(self.neurons),
+                self.inodes.copy(),
+                self.onodes.copy(),
+                self.weights.copy(),
+                self.innovs.copy(),
+                self.enabled.copy(),
+                dict(self.activations))
 
-        genome.genome_id = genome_id
+        genome.__compat = self.__compat
 
         return genome
 
@@ -78,73 +160,238 @@ class Genome(object):
 
         Returns: New baby genome.
         """
-        mom_genes = dict(map(lambda x: (x.innov, x), self.genes))
-        dad_genes = dict(map(lambda x: (x.innov, x), dad.genes))
+        stats.count(stats.CROSSOVERS)
 
         if mom_fitness > dad_fitness:
-            g1 = mom_genes
-            g2 = dad_genes
+            fittest, other = self, dad
         else:
-            g1 = dad_genes
-            g2 = mom_genes
+            fittest, other = dad, self
 
-        baby_genes = []
+        innovs1, index1 = fittest.__unique()
+        innovs2, index2 = other.__unique()
 
-        for innov, gene in g1.items():
-            if (innov in g2 and g2[innov].enabled and random.random() < 0.5):
-                baby_genes.append(copy.deepcopy(g2[innov]))
-            else:
-                baby_genes.append(copy.deepcopy(g1[innov]))
+        # Position of each of the fittest genes in the other parent
+        index = np.searchsorted(innovs2, innovs1)
+
+        np.minimum(index, max(len(innovs2)-1, 0), out=index)
+
+        index = index2[index] if len(innovs2) else index
+
+        choose = np.zeros(len(innovs1), dtype=bool)
 
-        neurons = {}
+        if len(innovs2):
+            choose = ((other.innovs[index] == innovs1) &
+                    other.enabled[index])
 
-        for g in baby_genes:
-            if not g.inode in neurons:
-                neurons[g.inode] = True
-            
-            if not g.onode in neurons:
-                neurons[g.onode] = True
+        choose[choose] = np.random.random(np.count_nonzero(choose)) < 0.5
 
-        inodes = filter(lambda x: x < self.neurons[0], neurons.keys())
-        hnodes = filter(lambda x: (x >= self.neurons[0] and
-            x < Genome.MAX_HIDDEN), neurons.keys())
-        onodes = filter(lambda x: x >= Genome.MAX_HIDDEN, neurons.keys())
+        def inherit(x, y):
+            return np.where(choose, y[index] if len(y) else x[index1],
+                    x[index1])
 
-        baby = Genome(innovs.next_genome(), 
-                [len(inodes), len(hnodes), len(onodes)],
-                baby_genes)
+        inodes = inherit(fittest.inodes, other.inodes)
+        onodes = inherit(fittest.onodes, other.onodes)
+
+        neurons = np.unique(np.concatenate((inodes, onodes)))
+
+        num_input = np.count_nonzero(neurons < self.neurons[0])
+        num_output = np.count_nonzero(neurons >= Genome.MAX_HIDDEN)
+
+        activations = dict(other.activations)
+
+        activations.update(fittest.activations)
+
+        activations = dict((x, y) for x, y in activations.items()
+                if x in neurons)
+
+        baby = Genome.from_arrays(innovs.next_genome(), 
+                [num_input, len(neurons)-num_input-num_output, num_output],
+                inodes,
+                onodes,
+                inherit(fittest.weights, other.weights),
+                inherit(fittest.innovs, other.innovs),
+                inherit(fittest.enabled, other.enabled),
+                activations)
 
         return baby
 
-    def genesis(self):
+    def structure_key(self):
+        """Structural hash key of the genome.
+
+        Genomes with equal keys produce networks that only differ in their
+        weights. The key is made of the neuron counts, the neurons found in
+        the genes, the (inode, onode) pairs of enabled genes in order, and
+        the activation of each neuron.
+        """
+        neurons = np.unique(np.concatenate((self.inodes, self.onodes)))
+
+        return (tuple(self.neurons),
+                neurons.tobytes(),
+                self.inodes[self.enabled].tobytes(),
+                self.onodes[self.enabled].tobytes(),
+                tuple(sorted(self.activations.items())))
+
+    def fitness_key(self, precision=0.0):
+        """Canonical hash of the network expressed by the genome.
+
+        Genomes with equal keys produce the same network, up to weights
+        that differ by less than precision. The enabled genes are sorted by
+        (inode, onode) so gene order does not matter, and weights are
+        rounded to multiples of precision, or compared exactly when it is
+        zero.
+
+        Args:
+            precision: Weight quantization step.
+
+        Returns:
+            Digest string.
+        """
+        inodes = self.inodes[self.enabled]
+        onodes = self.onodes[self.enabled]
+        weights = self.weights[self.enabled]
+
+        order = np.lexsort((onodes, inodes))
+
+        weights = weights[order]
+
+        if precision > 0:
+            weights = np.round(weights/precision).astype(np.int64)
+
+        digest = hashlib.sha1(repr((tuple(self.neurons),
+            tuple(sorted(self.activations.items())))))
+
+        digest.update(np.unique(np.concatenate((self.inodes,
+            self.onodes))).tobytes())
+        digest.update(inodes[order].tobytes())
+        digest.update(onodes[order].tobytes())
+        digest.update(weights.tobytes())
+
+        return digest.digest()
+
+    def genesis(self, conf=None, engine=None):
         """Generates phenotype from genotype.
 
-        Creates neural network describe by the genotype.
+        Creates neural network describe by the genotype. Only enabled genes
+        are expressed. Everything derived from the structure of the genome
+        is cached per structure_key, so building a network whose structure
+        was seen before is a single assignment of the weight vector.
+
+        The network type is chosen by conf.engine, see ENGINES. With 'auto'
+        genomes with at most conf.compile_threshold enabled genes are
+        compiled. The feed forward networks are used when
+        conf.allow_recurrent is off and the genome has no cycle, otherwise
+        the sparse network is used for genomes with at least
+        conf.sparse_min_hidden hidden neurons whose links fill less than
+        conf.sparse_density of the dense matrices.
+
+        Args:
+            conf: Conf instance, defaults to a dense network.
+            engine: Network type overriding conf.engine.
         """
-        neurons = {}
+        engine = engine if engine else self.__engine(conf)
 
-        # Create dictionary using neuron ids for easy conversion from
-        # relative indexes to absolute indexes, e.g. neurons ids 
-        # (0, 1, 2, 3, 1000, 1001) map to (0, 1, 2, 3, 4, 5).
-        for g in self.genes:
-            if not g.inode in neurons:
-                neurons[g.inode] = True
+        key = (engine, self.structure_key())
 
-            if not g.onode in neurons:
-                neurons[g.onode] = True
+        template = Genome.templates.get(key)
 
-        sneurons = sorted(neurons.keys())
-        
-        net = RNN(self.neurons, lambda x: 1/(1+math.exp(-4.9*x)))
+        stats.count(stats.PHENOTYPES)
+
+        if template is None:
+            stats.count(stats.TEMPLATES)
+
+            try:
+                template = (engine, self.__template(engine))
+            except ValueError:
+                if not conf or conf.engine != 'auto':
+                    raise
+
+                # Neuron ids shared between unrelated innovations can
+                # still produce cycles
+                engine = 'compiled' if engine == 'compiled_feedforward' \
+                        else 'dense'
+
+                template = (engine, self.__template(engine))
+
+            Genome.templates.put(key, template)
+
+        engine, template = template
+
+        return Genome.ENGINES[engine].from_template(template,
+                self.weights[self.enabled])
+
+    def __engine(self, conf):
+        if not conf:
+            return 'dense'
+
+        if conf.engine != 'auto':
+            return conf.engine
+
+        links = np.count_nonzero(self.enabled)
+
+        small = links <= conf.compile_threshold
+
+        if not conf.allow_recurrent:
+            return 'compiled_feedforward' if small else 'feedforward'
+
+        if small:
+            return 'compiled'
+
+        i, h, o = self.neurons
 
-        # Add links usin existing weight value
-        for g in self.genes:
-            inode = sneurons.index(g.inode)
-            onode = sneurons.index(g.onode)
+        if h < conf.sparse_min_hidden:
+            return 'dense'
 
-            net.add_link(inode, onode, g.weight)
+        size = h*i+h*h+o*(i+h)+h*o
 
-        return net
+        if links < conf.sparse_density*size:
+            return 'sparse'
+
+        return 'dense'
+
+    def __template(self, engine):
+        """Builds phenotype template of the genomes structure."""
+        neurons = np.concatenate((self.inodes, self.onodes))
+
+        hidden = np.unique(neurons[(neurons >= self.neurons[0]) &
+            (neurons < Genome.MAX_HIDDEN)])
+
+        dim = (self.neurons[0], len(hidden), self.neurons[2])
+
+        # Sorted neuron ids give the conversion from relative indexes to
+        # absolute indexes, e.g. neurons ids (0, 1, 2, 3, MAX_HIDDEN,
+        # MAX_HIDDEN+1) map to (0, 1, 2, 3, 4, 5). Every input and output
+        # is included even when no gene uses it.
+        sneurons = np.concatenate((
+            np.arange(self.neurons[0], dtype=np.int64),
+            hidden,
+            np.arange(self.neurons[2], dtype=np.int64)+Genome.MAX_HIDDEN))
+
+        activations = [self.activations.get(x, Genome.DEFAULT_ACTIVATION)
+                for x in sneurons[dim[0]:].tolist()]
+
+        inodes = np.searchsorted(sneurons, self.inodes[self.enabled])
+        onodes = np.searchsorted(sneurons, self.onodes[self.enabled])
+
+        return Genome.ENGINES[engine].template(dim, activations, inodes,
+                onodes)
+
+    @classmethod
+    def batch_genesis(cls, genomes, conf=None):
+        """Generates one phenotype for a list of genotypes.
+
+        Creates the network of each genome and packs them into a batch
+        that activates the whole list at once.
+
+        Args:
+            genomes: List of genomes sharing input and output neurons.
+            conf: Conf instance passed to genesis.
+
+        Returns:
+            BatchNeuralNetwork whose rows follow the order of genomes.
+        """
+        nets = [g.genesis(conf, 'dense') for g in genomes]
+
+        return BatchRNN(nets)
 
     def random_neuron(self, allow_input=True):
         """Chooses random neuron.
@@ -169,58 +416,85 @@ class Genome(object):
         for x in xrange(self.neurons[2]):
             pool[Genome.MAX_HIDDEN+x] = True
 
-        return random.choice(pool.keys())
+        pool = pool.keys()
+
+        return pool[np.random.randint(len(pool))]
 
     def mutate_weights(self, power, rate, mut=0, clamp=0):
-        """Mutates all gene weights
+        """Mutates all gene weights.
+
+        With probability 0.5 the mutation is severe, perturbing each gene
+        with probability 0.7 and replacing it with probability 0.2.
+        Otherwise each gene is perturbed with probability rate and half of
+        the genes are replaced with probability 0.1, except for the last
+        20 percent of the genes of genomes with at least 10 genes, which
+        are perturbed with probability 0.5 and replaced with probability
+        0.2. Every decision is drawn for all genes at once, see
+        batch_mutate_weights.
+
+        Args:
+            power: Largest perturbation.
+            rate: Probability of perturbing a gene.
+            mut: Replace every weight with a random one instead.
+            clamp: Limit of the absolute weights, none when 0.
         """
-        #for g in self.genes:
-        #    g.weight += random.random()*4.0-2.0
+        stats.count(stats.MUTATE_WEIGHTS)
 
-        if random.random() > 0.5:
-            severe = True
-        else:
-            severe = False
-
-        number = 0
-        gene_total = len(self.genes)
-        end_part = int(math.floor(gene_total*0.8))
-        power_mod = 1.0
-
-        for g in self.genes:
-            if severe:
-                gp = 0.3
-                cgp = 0.1
-            elif gene_total >= 10 and number > end_part:
-                gp = 0.5
-                cgp = 0.3
-            else:
-                if random.random() > 0.5:
-                    gp = 1.0 - rate
-                    cgp = 1.0 - rate - 0.1
-                else:
-                    gp = 1.0 - rate
-                    cgp = 1.0 - rate
-
-            rand = 1.0 if random.random() >= 0.5 else -1
-            rand *= random.random()*power*power_mod
-
-            if not mut:
-                choice = random.random()
-                if choice > gp:
-                    g.weight += rand
-                elif choice > cgp:
-                    g.weight = rand
-            else:
-                g.weight = rand
+        total = len(self.weights)
+
+        draws = np.random.random(1+4*total)
+
+        self.weights = _perturb_weights(self.weights, np.arange(total), total,
+                draws[0] > 0.5, draws[1:].reshape((-1, 4)).T, power, rate,
+                mut, clamp)
+
+        self.invalidate()
+
+    @classmethod
+    def batch_mutate_weights(cls, genomes, power, rate, mut=0, clamp=0):
+        """Mutates the weights of a list of genomes at once.
+
+        Equivalent to calling mutate_weights on each genome in order, with
+        the weights of every genome mutated in one vectorized pass. Each
+        genome consumes one draw deciding whether its mutation is severe
+        followed by four draws per gene, taken from a single call to
+        np.random.random so the draws do not depend on how the genomes are
+        batched.
+
+        Args:
+            genomes: List of genomes.
+            power, rate, mut, clamp: See mutate_weights.
+        """
+        if not genomes:
+            return
+
+        stats.count(stats.MUTATE_WEIGHTS, len(genomes))
+
+        lengths = np.array([len(g.weights) for g in genomes], dtype=int)
+
+        starts = np.repeat(np.cumsum(lengths)-lengths, lengths)
+
+        number = np.arange(lengths.sum())-starts
+        total = np.repeat(lengths, lengths)
+
+        sizes = 1+4*lengths
+        first = np.cumsum(sizes)-sizes
+
+        draws = np.random.random(sizes.sum())
+
+        severe = np.repeat(draws[first] > 0.5, lengths)
 
-            if clamp > 0:
-                if g.weight > clamp:
-                    g.weight = clamp
-                elif g.weight < -clamp:
-                    g.weight = -clamp
+        draws = np.delete(draws, first).reshape((-1, 4)).T
 
-            number += 1
+        weights = _perturb_weights(
+                np.concatenate([g.weights for g in genomes]),
+                number, total, severe, draws, power, rate, mut, clamp)
+
+        # Copied so genomes do not keep the whole batch alive
+        for g, w in zip(genomes, np.split(weights, np.cumsum(lengths)[:-1])):
+            g.weights = w.copy()
+
+            g.invalidate()
 
     def is_input(self, neuron):
         return True if neuron < self.neurons[0] else False
@@ -249,6 +523,8 @@ class Genome(object):
         Args:
             innovations: Instance of Innovations class.
         """
+        stats.count(stats.MUTATE_GENE)
+
         n1 = self.random_neuron()
         n2 = self.random_neuron(False)
 
@@ -269,20 +545,18 @@ class Genome(object):
         #    if n1 >= Genome.MAX_HIDDEN or n1 < self.neurons[0]:
         #        return False
 
-        check = map(lambda x: x.inode == n1 and x.onode == n2, self.genes)
-
-        if not any(check):
+        if not np.any((self.inodes == n1) & (self.onodes == n2)):
             innov = innovations.check_gene(n1, n2)
 
             if innov:
                 gene = innovations.create_gene_from_innov(innov)
             else:
                 gene = Gene(n1, n2, 
-                        random.random()*4.0-2.0, innovations.next_innov())
+                        np.random.random()*4.0-2.0, innovations.next_innov())
 
                 innovations.create_gene_innov(gene)
 
-            self.genes.append(gene)
+            self.add_gene(gene)
 
         return True
 
@@ -303,7 +577,9 @@ class Genome(object):
         Args:
             innovations: Instance of Innocations class.
         """
-        g = random.choice(self.genes)
+        stats.count(stats.MUTATE_NEURON)
+
+        g = GeneView(self, np.random.randint(len(self.innovs)))
 
         if not g.enabled:
             return
@@ -325,40 +601,176 @@ class Genome(object):
             innovations.create_neuron_innov(g, g1, g2, neuron)
 
         self.neurons[1] += 1
-        self.genes.append(g1)
-        self.genes.append(g2)
+        self.add_gene(g1)
+        self.add_gene(g2)
 
-    def compatible(self, conf, genome):
-        """Tests if two genomes are compatible.
+    def invalidate(self):
+        """Drops data cached from the genes.
+
+        Must be called whenever genes are changed outside of the mutate
+        methods.
+        """
+        self.__compat = None
+
+    def __unique(self):
+        """Sorted unique innovations and the index of their last gene."""
+        innovs, index = np.unique(self.innovs[::-1], return_index=True)
 
-        Compatibility is calculated from the weighted number of disjoint 
-        genes, and the weighted total average of the weight differences.
-        To be compatible this must all be less than some threshold.
+        return innovs, len(self.innovs)-1-index
+
+    def compat_arrays(self):
+        """Arrays used to compare genomes.
+
+        Built lazily and cached until the genome is mutated. When multiple
+        genes share an innovation the last one is used.
+
+        Returns:
+            2-tuple of sorted unique innovations and their aligned weights.
+        """
+        if self.__compat is None:
+            innovs, index = self.__unique()
+
+            self.__compat = (innovs, self.weights[index])
+
+        return self.__compat
+
+    def distance(self, conf, genome):
+        """Compatibility distance between two genomes.
+
+        Computed from the weighted number of disjoint genes, and the
+        weighted total average of the weight differences. Matching genes
+        are found by merging the sorted innovation arrays of both genomes.
 
         Args:
             conf: Conf instance.
-            genome: Genome we're testing against
+            genome: Genome we're measuring against
         """
-        g1 = dict(map(lambda x: (x.innov, x), self.genes))
-        g2 = dict(map(lambda x: (x.innov, x), genome.genes))
+        stats.count(stats.COMPAT_CHECKS)
 
-        g1_disjoint = filter(lambda x: not x in g2, g1)
-        g2_disjoint = filter(lambda x: not x in g1, g2)
+        innovs1, weights1 = self.compat_arrays()
+        innovs2, weights2 = genome.compat_arrays()
 
-        total_disjoint = len(g1_disjoint)+len(g2_disjoint)
+        if len(innovs1) and len(innovs2):
+            index = np.searchsorted(innovs1, innovs2)
 
-        matching = filter(lambda x: x in g1, g2)
+            np.minimum(index, len(innovs1)-1, out=index)
+
+            match = innovs1[index] == innovs2
+        else:
+            index = np.zeros(0, dtype=int)
+            match = np.zeros(0, dtype=bool)
+
+        matching = int(np.count_nonzero(match))
+
+        total_disjoint = len(innovs1)+len(innovs2)-2*matching
 
         total_avg = 0.0
 
-        for innov in matching:
-            total_avg += g1[innov].weight-g2[innov].weight
+        if matching:
+            total_avg = float(np.sum(weights1[index[match]]-weights2[match]))
+
+            total_avg /= float(matching)
+
+        return (total_disjoint*conf.coef_disjoint+
+                total_avg*conf.coef_matching)
+
+    @classmethod
+    def distance_matrix(cls, conf, genomes, others):
+        """Compatibility distance between two lists of genomes.
+
+        Encodes every genome as a presence and a weight vector over the
+        innovations found in both lists, then computes all distances with
+        a few matrix products. Entry (i, j) equals
+        genomes[i].distance(conf, others[j]).
+
+        Args:
+            conf: Conf instance.
+            genomes: List of genomes.
+            others: List of genomes.
+
+        Returns:
+            Array of shape (len(genomes), len(others)).
+        """
+        stats.count(stats.COMPAT_CHECKS, len(genomes)*len(others))
+
+        arrays = [g.compat_arrays() for g in genomes]+[
+                g.compat_arrays() for g in others]
+
+        space = np.unique(np.concatenate([x[0] for x in arrays]))
+
+        def encode(arrays):
+            lengths = np.array([len(x[0]) for x in arrays], dtype=int)
+
+            rows = np.repeat(np.arange(len(arrays)), lengths)
+            cols = np.searchsorted(space,
+                    np.concatenate([x[0] for x in arrays]))
 
-        total_avg /= float(len(matching))
+            present = np.zeros((len(arrays), len(space)))
+            weights = np.zeros((len(arrays), len(space)))
 
-        compat = (total_disjoint*conf.coef_disjoint+
+            present[rows, cols] = 1.0
+            weights[rows, cols] = np.concatenate([x[1] for x in arrays])
+
+            return lengths, present, weights
+
+        n1, p1, w1 = encode(arrays[:len(genomes)])
+        n2, p2, w2 = encode(arrays[len(genomes):])
+
+        matching = np.dot(p1, p2.T)
+
+        total_disjoint = n1[:, None]+n2[None, :]-2*matching
+
+        total_avg = np.dot(w1, p2.T)-np.dot(p1, w2.T)
+
+        np.divide(total_avg, matching, out=total_avg, where=matching > 0)
+
+        return (total_disjoint*conf.coef_disjoint+
                 total_avg*conf.coef_matching)
 
-        return compat < conf.compat_threshold
+    def compatible(self, conf, genome):
+        """Tests if two genomes are compatible.
+
+        To be compatible the distance between the genomes must be less
+        than some threshold. See distance.
+
+        Args:
+            conf: Conf instance.
+            genome: Genome we're testing against
+        """
+        return self.distance(conf, genome) < conf.compat_threshold
+
+def _perturb_weights(weights, number, total, severe, draws, power, rate,
+        mut, clamp):
+    """Mutated copy of weights, see Genome.mutate_weights.
+
+    Args:
+        weights: Weights of the genes.
+        number: Position of each gene in its genome.
+        total: Number of genes of the genome of each gene.
+        severe: Whether the mutation of each gene is severe.
+        draws: Array of shape (4, len(weights)), the uniform draws deciding
+            whether each gene is cold, the sign and size of its
+            perturbation, and whether it is perturbed or replaced.
+    """
+    # Probabilities the draw must exceed to perturb, gp, or replace, cgp, a
+    # gene of each kind: normal, cold, tail, and severe
+    gp = np.array((1.0-rate, 1.0-rate, 0.5, 0.3))
+    cgp = np.array((1.0-rate, 1.0-rate-0.1, 0.3, 0.1))
+
+    kind = (draws[0] > 0.5).astype(int)
+
+    kind[(total >= 10) & (number > np.floor(total*0.8))] = 2
+    kind[severe] = 3
+
+    rand = (2*(draws[1] >= 0.5)-1)*draws[2]*power
+
+    if mut:
+        weights = rand
+    else:
+        weights = np.where(draws[3] > gp[kind], weights+rand,
+                np.where(draws[3] > cgp[kind], rand, weights))
 
+    if clamp > 0:
+        np.clip(weights, -clamp, clamp, out=weights)
 
+    return weights
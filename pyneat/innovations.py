@@ -1,14 +1,28 @@
 from .genotype import Gene
+from . import stats
+
+from collections import namedtuple
+
+import hashlib
+
+GeneInnovation = namedtuple('GeneInnovation',
+        ['inode', 'onode', 'weight', 'innov'])
+
+NeuronInnovation = namedtuple('NeuronInnovation',
+        ['inode', 'onode', 'weight', 'old_innov', 'innov1', 'innov2',
+            'neuron'])
 
 class Innovations(object):
     """Tracks innovations.
 
-    Maintains list of gene and neuron mutations, preventing the recreation
-    of innovations that have already occurred.
+    Maintains registries of gene and neuron mutations, preventing the
+    recreation of innovations that have already occurred. Gene innovations
+    are keyed by (inode, onode) and neuron innovations by (inode, onode,
+    old_innov) so checking for an innovation takes constant time.
     """
     def __init__(self):
-        self.neuron_innov = []
-        self.gene_innov = []
+        self.neuron_innov = {}
+        self.gene_innov = {}
         self.innov = 0
         self.neuron = 0
         self.genome = 0
@@ -40,14 +54,7 @@ class Innovations(object):
 
         Matching criteria is the inode and onode of the link.
         """
-        check = map(lambda x: 
-                (x['inode'] == inode and x['onode'] == onode), 
-                self.gene_innov)
-
-        if any(check):
-            return self.gene_innov[check.index(True)]
-
-        return None
+        return self.gene_innov.get((inode, onode))
 
     def check_neuron(self, inode, onode, old_innov):
         """Check if neuron mutation exists.
@@ -55,57 +62,126 @@ class Innovations(object):
         Matching criteria is the inode, onode, and innovation of the 
         gene we're replacing.
         """
-        check = map(lambda x:
-                (x['inode'] == inode and x['onode'] == onode and 
-                    x['old_innov'] == old_innov),
-                self.neuron_innov)
-
-        if any(check):
-            return self.neuron_innov[check.index(True)]
-
-        return None
+        return self.neuron_innov.get((inode, onode, old_innov))
 
     def create_gene_from_innov(self, innov):
-        return Gene(
-                innov['inode'], 
-                innov['onode'], 
-                innov['weight'], 
-                innov['innov'])
+        return Gene(innov.inode, innov.onode, innov.weight, innov.innov)
 
     def create_neuron_from_innov(self, innov):
-        g1 = Gene(
-                innov['inode'],
-                innov['neuron'],
-                1.0,
-                innov['innov1'])
-
-        g2 = Gene(
-                innov['neuron'],
-                innov['onode'],
-                innov['weight'],
-                innov['innov2'])
+        g1 = Gene(innov.inode, innov.neuron, 1.0, innov.innov1)
+
+        g2 = Gene(innov.neuron, innov.onode, innov.weight, innov.innov2)
 
         return g1, g2
 
     def create_gene_innov(self, gene):
-        attr = {
-                'inode': gene.inode,
-                'onode': gene.onode,
-                'weight': gene.weight,
-                'innov': gene.innov 
-                }
+        innov = GeneInnovation(gene.inode, gene.onode, gene.weight,
+                gene.innov)
 
-        self.gene_innov.append(attr)
+        self.gene_innov.setdefault((gene.inode, gene.onode), innov)
+
+        stats.count(stats.GENE_INNOVATIONS)
 
     def create_neuron_innov(self, old_gene, g1, g2, neuron):
-        attr = {
-                'inode': old_gene.inode,
-                'onode': old_gene.onode,
-                'weight': old_gene.weight,
-                'old_innov': old_gene.innov,
-                'innov1': g1.innov,
-                'innov2': g2.innov,
-                'neuron': neuron
-                }
-
-        self.neuron_innov.append(attr)
+        innov = NeuronInnovation(old_gene.inode, old_gene.onode,
+                old_gene.weight, old_gene.innov, g1.innov, g2.innov, neuron)
+
+        self.neuron_innov.setdefault(
+                (old_gene.inode, old_gene.onode, old_gene.innov), innov)
+
+        stats.count(stats.NEURON_INNOVATIONS)
+
+def content_id(*key):
+    """Stable 60 bit id derived from key."""
+    return int(hashlib.sha1(repr(key)).hexdigest()[:15], 16)
+
+class ContentInnovations(Innovations):
+    """Innovations numbered by their content.
+
+    Innovation numbers are derived from the structural event itself, the
+    (inode, onode) of a new link or the (inode, onode, old_innov) of a
+    split link, and so is the neuron created by a split. Independent
+    copies therefore number the same mutation the same way, and their new
+    innovations can be combined with merge without renumbering.
+
+    Genes are created as usual and renumbered in place when their
+    innovation is recorded. Neurons are placed in the upper part of the
+    hidden neuron range, above NEURON_BASE.
+
+    Attributes:
+        base: Innovations looked up when not recorded here, see overlay.
+    """
+
+    NEURON_BASE = 2**20
+
+    def __init__(self, base=None):
+        super(ContentInnovations, self).__init__()
+
+        self.base = base
+
+    def overlay(self):
+        """Creates copy recording its new innovations apart.
+
+        The copy looks up the innovations recorded here without copying
+        them, so its own registries only hold the innovations it creates,
+        ready to be merged. These innovations must not change while the
+        copy is in use.
+        """
+        innovs = ContentInnovations(self)
+
+        innovs.innov, innovs.neuron = self.innov, self.neuron
+        innovs.genome, innovs.species = self.genome, self.species
+
+        return innovs
+
+    def check_gene(self, inode, onode):
+        innov = super(ContentInnovations, self).check_gene(inode, onode)
+
+        if innov is None and self.base is not None:
+            innov = self.base.check_gene(inode, onode)
+
+        return innov
+
+    def check_neuron(self, inode, onode, old_innov):
+        innov = super(ContentInnovations, self).check_neuron(inode, onode,
+                old_innov)
+
+        if innov is None and self.base is not None:
+            innov = self.base.check_neuron(inode, onode, old_innov)
+
+        return innov
+
+    def create_gene_innov(self, gene):
+        gene.innov = content_id('gene', gene.inode, gene.onode)
+
+        super(ContentInnovations, self).create_gene_innov(gene)
+
+    def create_neuron_innov(self, old_gene, g1, g2, neuron):
+        key = (old_gene.inode, old_gene.onode, old_gene.innov)
+
+        # The full width of the id, unrelated splits sharing a neuron would
+        # be merged into one by the networks
+        neuron = ContentInnovations.NEURON_BASE+content_id('neuron', *key)
+
+        g1.onode = g2.inode = neuron
+        g1.innov = content_id('in', *key)
+        g2.innov = content_id('out', *key)
+
+        super(ContentInnovations, self).create_neuron_innov(old_gene, g1, g2,
+                neuron)
+
+    def merge(self, gene_innov, neuron_innov):
+        """Adds innovations recorded by another copy.
+
+        Innovations already known keep their record, so merging copies in
+        a fixed order gives the same result every time.
+
+        Args:
+            gene_innov: Gene innovations of the other copy.
+            neuron_innov: Neuron innovations of the other copy.
+        """
+        for key, innov in gene_innov.iteritems():
+            self.gene_innov.setdefault(key, innov)
+
+        for key, innov in neuron_innov.iteritems():
+            self.neuron_innov.setdefault(key, innov)
@@ -0,0 +1,402 @@
+"""Island model.
+
+Evolves several populations, the islands, each in its own process. Every
+migration_interval generations the fittest organisms of each island are
+copied to its neighbours, see TOPOLOGIES. The islands share one innovation
+registry so a structural mutation receives the same innovation number on
+every island, keeping migrants compatible with their new population.
+"""
+from . import Organism
+from . import Population
+from .innovations import Innovations
+from .datalogger import DataRecorder
+from .evaluator import create_evaluator
+from .genotype import Genome
+
+from multiprocessing.managers import BaseManager
+
+import copy
+import logging
+import itertools
+import threading
+import multiprocessing
+import numpy as np
+
+def ring(index, islands):
+    """Each island sends to the next one."""
+    return [(index+1) % islands] if islands > 1 else []
+
+def fully_connected(index, islands):
+    """Each island sends to every other island."""
+    return [x for x in xrange(islands) if x != index]
+
+TOPOLOGIES = {
+        'ring': ring,
+        'full': fully_connected,
+        }
+
+class InnovationRegistry(object):
+    """Innovations shared between processes.
+
+    Lives in a manager process. Registering an innovation is atomic, the
+    first island to register a mutation decides its innovation number and
+    every later registration of the same mutation receives that record.
+    """
+    def __init__(self, innov):
+        self.innov = innov
+        self.gene_innov = {}
+        self.neuron_innov = {}
+        self.lock = threading.Lock()
+
+    def next_innov(self):
+        with self.lock:
+            next_id = self.innov
+
+            self.innov += 1
+
+            return next_id
+
+    def gene(self, key):
+        return self.gene_innov.get(key)
+
+    def neuron(self, key):
+        return self.neuron_innov.get(key)
+
+    def register_gene(self, innov):
+        with self.lock:
+            return self.gene_innov.setdefault((innov.inode, innov.onode),
+                    innov)
+
+    def register_neuron(self, innov):
+        with self.lock:
+            return self.neuron_innov.setdefault((innov.inode, innov.onode,
+                innov.old_innov), innov)
+
+class RegistryManager(BaseManager):
+    pass
+
+RegistryManager.register('InnovationRegistry', InnovationRegistry)
+
+class SharedInnovations(Innovations):
+    """Innovations of an island.
+
+    Looks up innovations in the shared registry when they are not known
+    locally, and registers new ones there. When another island registered
+    the same mutation first, the genes being created are changed in place
+    to use its innovation numbers and neuron.
+    """
+    def __init__(self, registry):
+        super(SharedInnovations, self).__init__()
+
+        self.registry = registry
+
+    def next_innov(self):
+        return self.registry.next_innov()
+
+    def check_gene(self, inode, onode):
+        innov = self.gene_innov.get((inode, onode))
+
+        if innov is None:
+            innov = self.registry.gene((inode, onode))
+
+            if innov is not None:
+                self.gene_innov[(inode, onode)] = innov
+
+        return innov
+
+    def check_neuron(self, inode, onode, old_innov):
+        key = (inode, onode, old_innov)
+
+        innov = self.neuron_innov.get(key)
+
+        if innov is None:
+            innov = self.registry.neuron(key)
+
+            if innov is not None:
+                self.neuron_innov[key] = innov
+
+        return innov
+
+    def create_gene_innov(self, gene):
+        super(SharedInnovations, self).create_gene_innov(gene)
+
+        key = (gene.inode, gene.onode)
+
+        innov = self.registry.register_gene(self.gene_innov[key])
+
+        self.gene_innov[key] = innov
+
+        gene.innov = innov.innov
+
+    def create_neuron_innov(self, old_gene, g1, g2, neuron):
+        super(SharedInnovations, self).create_neuron_innov(old_gene, g1, g2,
+                neuron)
+
+        key = (old_gene.inode, old_gene.onode, old_gene.innov)
+
+        innov = self.registry.register_neuron(self.neuron_innov[key])
+
+        self.neuron_innov[key] = innov
+
+        g1.innov, g2.innov = innov.innov1, innov.innov2
+        g1.onode = g2.inode = innov.neuron
+
+class Island(object):
+    """Population of one island, driven by IslandModel.
+
+    Attributes:
+        conf: Instance of Conf class.
+        pop: Population of the island.
+        evaluator: Evaluator of the organisms.
+    """
+    def __init__(self, conf, registry):
+        self.conf = conf
+        self.pop = Population(conf)
+        self.pop.innovs = SharedInnovations(registry)
+        self.evaluator = create_evaluator(conf)
+
+        genome = Genome.minimal_fully_connected(0,
+                (conf.num_input, conf.num_output))
+
+        self.pop.spawn(genome)
+
+    def evaluate(self, emigrants):
+        """Evaluates the organisms.
+
+        Args:
+            emigrants: Number of the fittest organisms to return.
+
+        Returns:
+            2-tuple of the winning genome, None if there is none, and a
+            list of (genome, fitness) 2-tuples of the fittest organisms.
+        """
+        organisms = self.pop.organisms
+
+        results = self.evaluator.evaluate([o.genome for o in organisms])
+
+        for o, result in itertools.izip(organisms, results):
+            o.fitness, o.winner = result
+
+            if o.winner:
+                return o.genome, []
+
+        fittest = sorted(organisms, key=lambda x: x.fitness,
+                reverse=True)[:emigrants]
+
+        return None, [(o.genome, o.fitness) for o in fittest]
+
+    def immigrate(self, immigrants):
+        """Replaces the least fit organisms with immigrants.
+
+        Args:
+            immigrants: List of (genome, fitness) 2-tuples.
+        """
+        pop = self.pop
+
+        immigrants = immigrants[:len(pop.organisms)]
+
+        if not immigrants:
+            return
+
+        weakest = sorted(pop.organisms, key=lambda x: x.fitness)[
+                :len(immigrants)]
+
+        weakest = set(id(o) for o in weakest)
+
+        for s in pop.species:
+            s.organisms = [o for o in s.organisms if id(o) not in weakest]
+
+        pop.species = [s for s in pop.species if s.organisms]
+        pop.organisms = [o for o in pop.organisms if id(o) not in weakest]
+
+        for genome, fitness in immigrants:
+            o = Organism(genome.duplicate(pop.innovs.next_genome()))
+
+            o.fitness = fitness
+
+            pop.speciate(o)
+
+            pop.organisms.append(o)
+
+    def generation(self):
+        """Returns DataRecorder notified of the current generation.
+
+        Used when the island found a winner, as the epoch is skipped.
+        """
+        recorder = DataRecorder()
+
+        recorder.notify_generation(self.pop.generation, self.pop.species)
+
+        return recorder
+
+    def epoch(self, immigrants):
+        """Performs the epoch after inserting immigrants.
+
+        Returns:
+            DataRecorder of the notifications of the epoch.
+        """
+        self.immigrate(immigrants)
+
+        recorder = DataRecorder()
+
+        self.pop.epoch(recorder)
+
+        return recorder
+
+def _island_worker(conn, conf, registry, seed):
+    np.random.seed(seed)
+
+    island = Island(conf, registry)
+
+    try:
+        while True:
+            command, args = conn.recv()
+
+            if command == 'stop':
+                break
+
+            conn.send(getattr(island, command)(*args))
+    finally:
+        island.evaluator.close()
+
+        conn.close()
+
+class IslandModel(object):
+    """Evolves conf.islands populations in parallel.
+
+    Each island is a Population of conf.pop_size organisms in its own
+    process. Generations are synchronized: every island evaluates its
+    organisms, then on migration generations the conf.migration_size
+    fittest organisms of each island are sent to its neighbours in
+    conf.migration_topology, where they replace the least fit organisms
+    before the epoch.
+
+    The first island to register a mutation decides its innovation number
+    and the record later occurrences copy, so runs are not reproducible
+    even with the same seed.
+
+    Attributes:
+        conf: Instance of Conf class.
+        islands: Number of islands.
+    """
+    def __init__(self, conf):
+        self.conf = conf
+        self.islands = conf.islands
+        self.log = logging.getLogger('island')
+
+        if conf.migration_topology not in TOPOLOGIES:
+            raise ValueError('Unknown migration topology %s' %
+                    (conf.migration_topology,))
+
+    def run(self, seed, observer=None, step=1, offset=0):
+        """Evolves the islands.
+
+        Notifications of each island are sent to observer preceded by
+        notify_population with offset plus the index of the island,
+        starting at 1.
+
+        Args:
+            seed: Seed of the run, each island derives its own from it.
+            observer: DataLogger notified of the generations.
+            step: Progress step of the first generation.
+            offset: Added to the population index of the islands.
+
+        Returns:
+            The winning genome, None if no winner was found.
+        """
+        conf = copy.copy(self.conf)
+
+        # Islands are processes already, work serially inside them
+        conf.workers = 1
+
+        topology = TOPOLOGIES[conf.migration_topology]
+
+        genome = Genome.minimal_fully_connected(0,
+                (conf.num_input, conf.num_output))
+
+        manager = RegistryManager()
+
+        manager.start()
+
+        registry = manager.InnovationRegistry(len(genome.innovs))
+
+        conns = []
+        processes = []
+
+        for x in xrange(self.islands):
+            parent, child = multiprocessing.Pipe()
+
+            p = multiprocessing.Process(target=_island_worker,
+                    args=(child, conf, registry, (seed+x) % 2**32))
+
+            p.daemon = True
+            p.start()
+
+            conns.append(parent)
+            processes.append(p)
+
+        max_step = conf.runs*conf.generations
+
+        try:
+            for g in xrange(conf.generations):
+                migrate = (conf.migration_interval > 0 and
+                        (g+1) % conf.migration_interval == 0)
+
+                size = conf.migration_size if migrate else 0
+
+                for conn in conns:
+                    conn.send(('evaluate', (size,)))
+
+                replies = [conn.recv() for conn in conns]
+
+                for x, (winner, emigrants) in enumerate(replies):
+                    if winner is not None:
+                        if observer:
+                            conns[x].send(('generation', ()))
+
+                            observer.notify_population(offset+x+1)
+
+                            conns[x].recv().replay(observer)
+
+                        self.log.info('island %d found a winner', x+1)
+
+                        return winner
+
+                immigrants = [[] for x in xrange(self.islands)]
+
+                for x, (winner, emigrants) in enumerate(replies):
+                    for y in topology(x, self.islands):
+                        immigrants[y] += emigrants
+
+                for conn, migrants in zip(conns, immigrants):
+                    conn.send(('epoch', (migrants,)))
+
+                for x, conn in enumerate(conns):
+                    recorder = conn.recv()
+
+                    if observer:
+                        observer.notify_population(offset+x+1)
+
+                        recorder.replay(observer)
+
+                if observer:
+                    observer.notify_progress(progress=round(
+                        float(step)*100/float(max_step), 2))
+
+                step += 1
+
+            return None
+        finally:
+            for conn in conns:
+                try:
+                    conn.send(('stop', ()))
+                except IOError:
+                    pass
+
+            for p in processes:
+                p.join(1)
+
+                if p.is_alive():
+                    p.terminate()
+
+            manager.shutdown()
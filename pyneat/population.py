@@ -1,10 +1,15 @@
 from . import Species
 from . import Organism
 from . import Innovations
+from .innovations import ContentInnovations
+from .genotype import Genome
+from .table import PopulationTable
+from . import checkpoint
+from . import stats
 
-import math
-import random
 import logging
+import multiprocessing
+import numpy as np
 
 class Population(object):
     """Population of organisms.
@@ -20,33 +25,62 @@ class Population(object):
         self.organisms = []
         self.species = []
         self.generation = 1
-        self.innovs = Innovations()
+        self.innovs = INNOVATIONS[conf.innovation_mode]()
         self.log = logging.getLogger('population')
 
+    @classmethod
+    def load(cls, path, conf):
+        """Loads population from checkpoint.
+
+        Restores the organisms, species, innovations, and random number
+        generator so evolution continues exactly as if it had never
+        stopped. See checkpoint module.
+
+        Args:
+            path: Checkpoint file written by save.
+            conf: Instance of Conf class.
+        """
+        pop = cls(conf)
+
+        checkpoint.load(pop, path)
+
+        return pop
+
+    def save(self, path, base=None, run=1):
+        """Saves population to checkpoint.
+
+        Args:
+            path: Destination file, replaced atomically.
+            base: Optional path of a full checkpoint, only the genomes and
+                innovations missing from it are written.
+            run: Run of the experiment the population belongs to.
+        """
+        checkpoint.save(self, path, base, run)
+
     def spawn(self, genome):
         """Spawns initial population
 
-        Creates population from an inital genome, mutating between each
-        duplication.
+        Creates population from an inital genome, randomizing the weights
+        of every duplicate in one batch.
 
         Args:
             genome: initial genome of the population
         """
         self.log.info('spawning %d organisms', self.conf.pop_size)
 
-        for x in xrange(self.conf.pop_size):
-            new_genome = genome.duplicate(x)
+        genomes = [genome.duplicate(x) for x in xrange(self.conf.pop_size)]
 
-            new_genome.mutate_weights(self.conf.mutate_power, 1.0, 1, self.conf.clamp_weights)
+        Genome.batch_mutate_weights(genomes, self.conf.mutate_power, 1.0, 1,
+                self.conf.clamp_weights)
 
-            org = Organism(new_genome)
+        organisms = [Organism(g) for g in genomes]
 
-            self.speciate(org)
+        self.speciate_all(organisms)
 
-            self.organisms.append(org)
+        self.organisms += organisms
 
         # Initialize innovation
-        self.innovs.innov = len(genome.genes)
+        self.innovs.innov = len(genome.innovs)
         self.innovs.genome = len(self.organisms)        
 
     def speciate(self, organism):
@@ -73,64 +107,120 @@ class Population(object):
 
         self.log.info('creating new species %d', species.species_id)
 
-    def cull_species(self):
+    def speciate_all(self, organisms):
+        """Speciate list of organisms.
+
+        Places organisms exactly as calling speciate on each of them in
+        order would, but compares them against the species representatives
+        with one distance matrix. Organisms that do not fit an existing
+        species are compared against each species created during the pass,
+        one vectorized row per new species.
+
+        Args:
+            organisms: List of organisms to be speciated.
+        """
+        if not organisms:
+            return
+
+        genomes = [o.genome for o in organisms]
+
+        remaining = np.arange(len(organisms))
+
+        if self.species:
+            reps = [s.organisms[0].genome for s in self.species]
+
+            compat = Genome.distance_matrix(self.conf, reps, genomes).T < \
+                    self.conf.compat_threshold
+
+            placed = compat.any(axis=1)
+            first = compat.argmax(axis=1)
+
+            for x in np.flatnonzero(placed):
+                self.species[first[x]].organisms.append(organisms[x])
+
+            remaining = remaining[~placed]
+
+        while len(remaining):
+            rep = remaining[0]
+
+            species = Species(self.innovs.next_species())
+
+            species.organisms.append(organisms[rep])
+
+            self.species.append(species)
+
+            self.log.info('creating new species %d', species.species_id)
+
+            remaining = remaining[1:]
+
+            if len(remaining):
+                compat = Genome.distance_matrix(self.conf, [genomes[rep]],
+                        [genomes[x] for x in remaining])[0] < \
+                        self.conf.compat_threshold
+
+                for x in remaining[compat]:
+                    species.organisms.append(organisms[x])
+
+                remaining = remaining[~compat]
+
+    def cull_species(self, table=None):
         """Culling the species.
 
         Order the organisms by fitness then trim the lower performing.
         Allowing only the top performing to repopulate the next generation.
-        """
-        for s in self.species:
-            organism_cnt = len(s.organisms)
 
-            s.organisms.sort(cmp=lambda x, y: cmp(x.fitness, y.fitness),
-                    reverse=True)
-
-            # Since we take the floor we add one so there's atleast one 
-            # survivor.
-            survivors = int(math.floor(organism_cnt*self.conf.survival_rate))+1
+        Args:
+            table: PopulationTable of the current organisms, built when not
+                given.
+        """
+        if table is None:
+            table = PopulationTable(self.species)
 
-            map(lambda x: x.marked_death(), s.organisms[survivors:])
+        table.cull(self.conf.survival_rate)
 
+        for s, size in zip(self.species, table.sizes):
             self.log.info('gen %d culled species %d from %d to %d',
                     self.generation,
                     s.species_id,
-                    organism_cnt,
+                    size,
                     len(s.organisms))
 
-    def rank(self):
+    def rank(self, table=None):
         """Ranks organisms globally.
 
-        Builds temporary list of potential parents then ranks them globally
-        where the least fit receive a smaller rank than the most fit.
-        """
-        parents = []
+        Ranks the potential parents globally where the least fit receive a
+        smaller rank than the most fit.
 
-        for s in self.species:
-            parents += s.organisms
-
-        parents.sort(cmp=lambda x, y: cmp(x.fitness, y.fitness))
+        Args:
+            table: PopulationTable of the current organisms, built when not
+                given.
+        """
+        if table is None:
+            table = PopulationTable(self.species)
 
-        for p in xrange(len(parents)):
-            parents[p].rank = p+1
+        table.rank_organisms()
 
-    def remove_stagnating_species(self):
+    def remove_stagnating_species(self, table=None):
         """Remove stagnating species.
 
         Updates a species max_fitness, ages the species if no improvement has
         occurred and removes species older than the stagnation threshold.
-        """
-        for s in self.species:
-            imp = False    
 
-            for o in s.organisms:
-                if o.fitness > s.max_fitness:
-                    imp = True
+        Args:
+            table: PopulationTable of the current organisms, built when not
+                given.
+        """
+        if table is None:
+            table = PopulationTable(self.species)
 
-                    s.max_fitness = o.fitness
+        best = table.best_fitness()
 
-                    s.age_since_imp = 0
+        for s, fitness in zip(self.species, best.tolist()):
+            if fitness > s.max_fitness:
+                s.max_fitness = fitness
 
-            if not imp:
+                s.age_since_imp = 0
+            else:
                 s.age_since_imp += 1
 
             if s.age_since_imp >= self.conf.stagnation_threshold:
@@ -141,25 +231,26 @@ class Population(object):
                         s.species_id,
                         s.age_since_imp)
 
-    def remove_weak_species(self):
+    def remove_weak_species(self, table=None):
         """Removes weak species.
         
         Calculates the average fitness for each species then assigns their 
         portion of the next generation. The proportionality is based on 
         their contribution to the populations overall fitness. 
-        """
-        total_avg_fitness = 0.0
-
-        for s in self.species:
-            total = sum(map(lambda x: x.rank, s.organisms))
 
-            s.avg_fitness = float(total)/float(len(s.organisms))
+        Args:
+            table: PopulationTable of the current organisms, built when not
+                given.
+        """
+        if table is None:
+            table = PopulationTable(self.species)
 
-            total_avg_fitness += s.avg_fitness
+        avg, offspring = table.shares(self.conf.pop_size)
 
-        for s in self.species:
-            s.offspring = int(math.floor(
-                    (s.avg_fitness*(self.conf.pop_size-len(self.species))/total_avg_fitness)))+1
+        for s, avg_fitness, num in zip(self.species, avg.tolist(),
+                offspring.tolist()):
+            s.avg_fitness = avg_fitness
+            s.offspring = num
 
             if s.offspring == 0:
                 s.marked = True
@@ -168,13 +259,138 @@ class Population(object):
                         self.generation,
                         s.species_id)
 
-    def remove_marked(self):
-        for s in self.species:
+    def remove_marked(self, table=None):
+        """Removes marked species and organisms.
+
+        Args:
+            table: PopulationTable of the current organisms, built when not
+                given.
+        """
+        if table is None:
+            table = PopulationTable(self.species)
+
+        for s, survivors in zip(self.species, table.survivors()):
             if not s.marked:
-                s.organisms = filter(lambda x: not x.marked, s.organisms)
+                s.organisms = survivors
 
         self.species = filter(lambda x: not x.marked, self.species)
 
+    def plan_reproduction(self):
+        """Plans the reproduction of every species.
+
+        Allocates the children of the generation, one less than its
+        offspring to each species plus the gap to the population size,
+        given to random species. Builds each species roulette wheel once
+        and draws the parents of every child with a single searchsorted
+        over the wheels laid end to end. Children filling the gap descend
+        from the species champion, as the species is reduced to its
+        champion before the gap is filled.
+
+        Returns:
+            List of (species, num, parents) 3-tuples, see Species.epoch.
+        """
+        species = self.species
+
+        counts = np.array([s.offspring-1 for s in species], dtype=int)
+
+        gap = self.conf.pop_size-len(species)-counts.sum()
+
+        extra = np.zeros(len(species), dtype=int)
+
+        if gap > 0:
+            extra = np.bincount(np.random.randint(0, len(species), gap),
+                    minlength=len(species))
+
+        tables = [s.selection_table() for s in species]
+
+        sizes = np.array([len(t) for t in tables], dtype=int)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        # Wheel of species x covers (x, x+1]
+        wheels = np.concatenate([t+x for x, t in enumerate(tables)])
+
+        owner = np.repeat(np.arange(len(species)), counts)
+
+        parents = np.searchsorted(wheels,
+                np.random.random((len(owner), 2))+owner[:, None],
+                side='right')
+
+        np.minimum(parents, (starts+sizes-1)[owner][:, None], out=parents)
+
+        parents -= starts[owner][:, None]
+
+        parents = np.split(parents, np.cumsum(counts)[:-1])
+
+        plan = []
+
+        for x, s in enumerate(species):
+            num = counts[x]+extra[x]
+
+            if extra[x]:
+                fitness = np.array([o.fitness for o in s.organisms])
+
+                champion = np.full((extra[x], 2), np.argmax(fitness),
+                        dtype=int)
+
+                parents[x] = np.concatenate((parents[x], champion))
+
+            plan.append((s, int(num), parents[x]))
+
+        return plan
+
+    def reproduce_species(self, plan):
+        """Reproduces every species independently.
+
+        Used with content innovations, see ContentInnovations. Each species
+        is reproduced with its own overlay of the innovations and a seed
+        drawn here in species order, in a pool of
+        conf.reproduction_workers processes when more than one. The pool is
+        started for the epoch, its processes inherit the innovations
+        instead of receiving a copy with every species. The new
+        innovations of the species are merged in species order and the
+        children receive their genome ids here, so the result does not
+        depend on the number of workers.
+
+        Args:
+            plan: Plan of the reproduction, see plan_reproduction.
+
+        Returns:
+            List of children.
+        """
+        seeds = np.random.randint(2**32, size=len(plan)).tolist()
+
+        tasks = [(s.species_id, list(s.organisms), num, parents, self.conf,
+            seed) for (s, num, parents), seed in zip(plan, seeds)]
+
+        if self.conf.reproduction_workers > 1:
+            pool = multiprocessing.Pool(self.conf.reproduction_workers,
+                    _init_reproduction, (self.innovs,))
+
+            try:
+                results = pool.map(_reproduce_species, tasks)
+
+                pool.close()
+            except:
+                pool.terminate()
+
+                raise
+            finally:
+                pool.join()
+        else:
+            results = [_reproduce_species(t, self.innovs) for t in tasks]
+
+        children = []
+
+        for genomes, gene_innov, neuron_innov in results:
+            self.innovs.merge(gene_innov, neuron_innov)
+
+            for g in genomes:
+                g.genome_id = self.innovs.next_genome()
+
+                children.append(Organism(g))
+
+        return children
+
     def epoch(self, observer):
         """Populations epoch.
 
@@ -190,42 +406,97 @@ class Population(object):
         fill in the gap. All the new organisms need to be speciated and the 
         populations epoch is done.
 
+        The time spent in each phase and the operations counted since the
+        previous epoch are passed to the observer, see stats module.
+
         Args:
             generation: Current generation.
         """
-        self.cull_species()
+        epoch_stats = stats.EpochStats(self.generation)
+
+        with epoch_stats.phase('cull'):
+            table = PopulationTable(self.species)
 
-        self.remove_stagnating_species()
+            self.cull_species(table)
 
-        self.rank()
+        with epoch_stats.phase('stagnation'):
+            self.remove_stagnating_species(table)
 
-        self.remove_weak_species()
+        with epoch_stats.phase('rank'):
+            self.rank(table)
+
+        with epoch_stats.phase('weak'):
+            self.remove_weak_species(table)
 
         if observer:
             observer.notify_generation(self.generation, self.species)
 
-        self.remove_marked()
+        with epoch_stats.phase('reproduce'):
+            self.remove_marked(table)
 
-        children = []
+            plan = self.plan_reproduction()
 
-        for s in self.species:
-            children += s.epoch(self.conf, self.innovs)
-
-            s.organisms.sort(cmp=lambda x, y: cmp(x.fitness, y.fitness),
-                    reverse=True)
+            if isinstance(self.innovs, ContentInnovations):
+                children = self.reproduce_species(plan)
+            else:
+                children = []
 
-            del s.organisms[1:]
+                for s, num, parents in plan:
+                    children += s.epoch(self.conf, self.innovs, num, parents)
 
-        while len(children)+len(self.species) < self.conf.pop_size:
-            s = random.choice(self.species)
+            for s in self.species:
+                s.organisms.sort(cmp=lambda x, y: cmp(x.fitness, y.fitness),
+                        reverse=True)
 
-            children += s.epoch(self.conf, self.innovs, num=1)
+                del s.organisms[1:]
 
-        for c in children:
-            self.speciate(c)
+        with epoch_stats.phase('speciate'):
+            self.speciate_all(children)
 
         del self.organisms[:]
 
         self.organisms = sum(map(lambda x: x.organisms, self.species), [])
 
+        epoch_stats.counters = stats.collect()
+
+        if observer:
+            observer.notify_epoch_stats(epoch_stats)
+
         self.generation += 1
+
+INNOVATIONS = {
+        'sequential': Innovations,
+        'content': ContentInnovations,
+        }
+
+# Innovations of the epoch in reproduction workers, see _init_reproduction
+_innovs = None
+
+def _init_reproduction(innovs):
+    global _innovs
+
+    _innovs = innovs
+
+def _reproduce_species(task, innovs=None):
+    species_id, organisms, num, parents, conf, seed = task
+
+    # Species must not see each others innovations
+    innovs = (innovs if innovs is not None else _innovs).overlay()
+
+    # Also used in this process, where the generator must be left as it
+    # was
+    state = np.random.get_state()
+
+    np.random.seed(seed)
+
+    species = Species(species_id)
+
+    species.organisms = organisms
+
+    try:
+        children = species.epoch(conf, innovs, num, parents)
+    finally:
+        np.random.set_state(state)
+
+    return [o.genome for o in children], innovs.gene_innov, \
+            innovs.neuron_innov
@@ -1,7 +1,8 @@
 from . import Organism
+from .genotype import Genome
 
-import random
 import logging
+import numpy as np
 
 class Species(object):
     """Species of organisms.
@@ -23,49 +24,53 @@ class Species(object):
         self.marked = False
         self.log = logging.getLogger('species')
 
-    def epoch(self, conf, innovs, num=None):
+    def epoch(self, conf, innovs, num=None, parents=None):
         """Species epoch.
 
         During species epoch the next generations children are created.
         The default selection process is rank where the rank determines
-        the probability and then a basic roulette wheel is applied.
+        the probability and then a basic roulette wheel is applied. Every
+        decision is drawn from np.random, as are the parents.
 
         Args:
             conf: Instance of Conf class.
             innovs: Instance of Innovations class.
+            num: Number of children, defaults to one less than offspring.
+            parents: Optional (num, 2) array of the organisms to use as
+                parent and second parent of each child, as indexes into
+                the organisms sorted by selection_table. Drawn here when
+                not given.
 
         Retruns: List of new children.
         """
         children = []
 
-        self.organisms.sort(cmp=lambda x, y: cmp(x.rank, y.rank))
-
-        local_ranks = [i for i in xrange(1, len(self.organisms)+1)]
-
-        sum_rank = sum(local_ranks)
+        # Weights are mutated together once every child is created
+        weight_mutants = []
 
-        local_probs = [float(i)/float(sum_rank) for i in local_ranks]
+        offspring = self.offspring-1 if num is None else num
 
-        shift_probs = [sum(local_probs[:i+1]) for i in xrange(len(local_probs))]
+        if parents is None:
+            parents = self.draw_parents(offspring)
+        else:
+            self.selection_table()
 
-        pool = zip(shift_probs, self.organisms)
-
-        offspring = num if num else self.offspring-1
+        parents = parents.tolist()
 
         # Produce one less than offspring since the most fit will be passed on
         for x in xrange(offspring):
-            if random.random() < conf.mutate_only_prob:
-                the_org = self.random_org(pool)
+            if np.random.random() < conf.mutate_only_prob:
+                the_org = self.organisms[parents[x][0]]
 
                 baby_genome = the_org.genome.duplicate(innovs.next_genome())
 
-                if random.random() < conf.mutate_neuron_prob:
+                if np.random.random() < conf.mutate_neuron_prob:
                     self.log.info('genome %d parent %d mutate neuron',
                             baby_genome.genome_id,
                             the_org.genome.genome_id)
 
                     baby_genome.mutate_neuron(innovs)
-                elif random.random() < conf.mutate_gene_prob:
+                elif np.random.random() < conf.mutate_gene_prob:
                     self.log.info('genome %d parent %d mutate gene',
                             baby_genome.genome_id,
                             the_org.genome.genome_id)
@@ -78,10 +83,10 @@ class Species(object):
                             baby_genome.genome_id,
                             the_org.genome.genome_id)
 
-                    baby_genome.mutate_weights(conf.mutate_power, 1.0, conf.clamp_weights)
+                    weight_mutants.append(baby_genome)
             else:
-                mom = self.random_org(pool)
-                dad = self.random_org(pool)
+                mom = self.organisms[parents[x][0]]
+                dad = self.organisms[parents[x][1]]
 
                 baby_genome = mom.genome.crossover(
                         dad.genome, 
@@ -98,13 +103,13 @@ class Species(object):
                 # genome or if they're compatible.
                 if (mom.genome.genome_id == dad.genome.genome_id or
                         mom.genome.compatible(conf, dad.genome) or
-                        random.random() > conf.mate_only_prob):
-                    if random.random() < conf.mutate_neuron_prob:
+                        np.random.random() > conf.mate_only_prob):
+                    if np.random.random() < conf.mutate_neuron_prob:
                         self.log.info('genome %d mutate neuron after mate',
                                 baby_genome.genome_id)
                         
                         baby_genome.mutate_neuron(innovs)
-                    elif random.random() < conf.mutate_gene_prob:
+                    elif np.random.random() < conf.mutate_gene_prob:
                         self.log.info('genome %d mutate gene after mate',
                                 baby_genome.genome_id)
 
@@ -115,27 +120,38 @@ class Species(object):
                         self.log.info('genome %d mutate weights after mate',
                                 baby_genome.genome_id)
 
-                        baby_genome.mutate_weights(conf.mutate_power, 1.0, conf.clamp_weights)
+                        weight_mutants.append(baby_genome)
 
             children.append(Organism(baby_genome))
 
+        Genome.batch_mutate_weights(weight_mutants, conf.mutate_power, 1.0,
+                clamp=conf.clamp_weights)
+
         return children
 
-    def random_org(self, pool):
-        """Selects random organism from pool.
+    def selection_table(self):
+        """Sorts organisms by rank and builds their roulette wheel.
 
-        Runs the roulette wheel to select an organism.
+        Organisms are weighted by their position in the rank order.
 
-        Args:
-            pool: Array of 2-tuple sets where the first item is the probability
-                    between 0.0 and 1.0 and the second item is the organism.
+        Returns:
+            Cumulative selection probability of each organism.
+        """
+        self.organisms.sort(cmp=lambda x, y: cmp(x.rank, y.rank))
+
+        table = np.cumsum(np.arange(1, len(self.organisms)+1, dtype=float))
+
+        return table/table[-1] if len(table) else table
+
+    def draw_parents(self, num):
+        """Draws the parents of num children.
 
-        Returns: Selected organism from pool.
+        Returns:
+            Array of shape (num, 2), see epoch.
         """
-        sel = random.random()
+        table = self.selection_table()
 
-        for candidate in pool:
-            if sel < candidate[0]:
-                return candidate[1]
+        parents = np.searchsorted(table, np.random.random((num, 2)),
+                side='right')
 
-        return None
+        return np.minimum(parents, len(table)-1)
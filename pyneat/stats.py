@@ -0,0 +1,67 @@
+"""Instrumentation of the evolutionary loop.
+
+Operations count themselves into process wide counters with count, which
+costs a single dict update. Population.epoch times each of its phases
+and collects the counters once per generation into an EpochStats, which
+is delivered to observers. Counters only cover the current process, work
+done by evaluation workers is not included.
+"""
+from collections import Counter
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import time
+
+# Monotonic where available, time.time is the closest python 2 offers
+clock = getattr(time, 'monotonic', time.time)
+
+COMPAT_CHECKS = 'compat_checks'
+CROSSOVERS = 'crossovers'
+MUTATE_WEIGHTS = 'mutate_weights'
+MUTATE_GENE = 'mutate_gene'
+MUTATE_NEURON = 'mutate_neuron'
+GENE_INNOVATIONS = 'gene_innovations'
+NEURON_INNOVATIONS = 'neuron_innovations'
+PHENOTYPES = 'phenotypes'
+TEMPLATES = 'templates'
+
+counters = Counter()
+
+def count(name, n=1):
+    counters[name] += n
+
+def collect():
+    """Returns the counters and starts counting from zero."""
+    values = dict(counters)
+
+    counters.clear()
+
+    return values
+
+class EpochStats(object):
+    """Timings and counters of a generation.
+
+    Attributes:
+        generation: Generation the stats belong to.
+        timings: Seconds spent in each phase, in the order they ran.
+        counters: Operations counted since the previous generation, see
+            the module constants.
+    """
+    def __init__(self, generation):
+        self.generation = generation
+        self.timings = OrderedDict()
+        self.counters = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Times the enclosed block as phase name."""
+        start = clock()
+
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0)+clock()-start
+
+    @property
+    def total(self):
+        return sum(self.timings.values())
@@ -0,0 +1,139 @@
+"""Columnar view of a population.
+
+The selection bookkeeping of an epoch, culling, stagnation, ranking and
+offspring allocation, works on whole columns of the organisms at once.
+Organism and Species objects remain the reference, every result is
+written back to them.
+"""
+from operator import attrgetter
+
+import numpy as np
+
+class PopulationTable(object):
+    """Arrays of the organisms of a population.
+
+    Organisms are stored species after species, in the order of the
+    species list, so the organisms of species x occupy
+    starts[x]:starts[x]+sizes[x].
+
+    Attributes:
+        species: Species of the table.
+        organisms: Organisms of every species, in table order.
+        sizes: Number of organisms of each species.
+        starts: Index of the first organism of each species.
+        group: Index of the species of each organism.
+        fitness: Fitness of each organism.
+        rank: Global rank of each organism.
+        marked: Whether each organism is marked for death.
+    """
+    def __init__(self, species):
+        self.species = list(species)
+        self.organisms = [o for s in self.species for o in s.organisms]
+
+        self.sizes = np.array([len(s.organisms) for s in self.species],
+                dtype=int)
+        self.starts = np.concatenate(([0], np.cumsum(self.sizes)[:-1])
+                ).astype(int)
+        self.group = np.repeat(np.arange(len(self.species)), self.sizes)
+
+        self.fitness = np.array(map(attrgetter('fitness'), self.organisms),
+                dtype=float)
+        self.rank = np.array(map(attrgetter('rank'), self.organisms),
+                dtype=int)
+        self.marked = np.array(map(attrgetter('marked'), self.organisms),
+                dtype=bool)
+
+    def reduce(self, ufunc, values, empty):
+        """Reduces values over the organisms of each species.
+
+        Args:
+            ufunc: Binary ufunc, e.g. np.add.
+            values: Array with one value per organism.
+            empty: Result of species without organisms.
+
+        Returns:
+            Array with one result per species.
+        """
+        result = np.full(len(self.species), empty, dtype=values.dtype)
+
+        nonempty = self.sizes > 0
+
+        if nonempty.any():
+            result[nonempty] = ufunc.reduceat(values, self.starts[nonempty])
+
+        return result
+
+    def cull(self, survival_rate):
+        """Sorts each species by fitness and marks the least fit.
+
+        Organisms of equal fitness keep their order. Each species keeps
+        floor(size*survival_rate)+1 organisms, the rest is marked for
+        death.
+        """
+        order = np.lexsort((-self.fitness, self.group))
+
+        self.fitness = self.fitness[order]
+        self.rank = self.rank[order]
+        self.marked = self.marked[order]
+        self.organisms = [self.organisms[x] for x in order]
+
+        survivors = np.floor(self.sizes*survival_rate).astype(int)+1
+
+        position = np.arange(len(self.organisms))-self.starts[self.group]
+
+        dead = position >= survivors[self.group]
+
+        self.marked |= dead
+
+        for x in np.flatnonzero(dead):
+            self.organisms[x].marked_death()
+
+        for s, start, size in zip(self.species, self.starts, self.sizes):
+            s.organisms = self.organisms[start:start+size]
+
+    def rank_organisms(self):
+        """Ranks organisms globally, the least fit receives rank 1.
+
+        Organisms of equal fitness are ranked in table order.
+        """
+        order = np.argsort(self.fitness, kind='mergesort')
+
+        self.rank[order] = np.arange(1, len(order)+1)
+
+        for o, rank in zip(self.organisms, self.rank.tolist()):
+            o.rank = rank
+
+    def best_fitness(self):
+        """Returns the highest fitness of each species, -inf when empty."""
+        return self.reduce(np.maximum, self.fitness, -np.inf)
+
+    def shares(self, pop_size):
+        """Allocates the offspring of each species.
+
+        Species receive offspring in proportion to the average rank of
+        their organisms, plus one.
+
+        Args:
+            pop_size: Size of the population.
+
+        Returns:
+            2-tuple of the average rank and the offspring of each species.
+        """
+        avg = self.reduce(np.add, self.rank, 0).astype(float)/self.sizes
+
+        # Summed sequentially, pairwise summation may round differently and
+        # move an offspring count across the floor
+        total = np.cumsum(avg)[-1] if len(avg) else 0.0
+
+        offspring = np.floor(avg*(pop_size-len(self.species))/total
+                ).astype(int)+1
+
+        return avg, offspring
+
+    def survivors(self):
+        """Returns the organisms not marked for death of each species."""
+        alive = (~self.marked).tolist()
+
+        return [[o for o, a in zip(self.organisms[start:start+size],
+            alive[start:start+size]) if a]
+            for start, size in zip(self.starts, self.sizes)]
@@ -0,0 +1,12 @@
+from pyneat import benchmark
+
+def test_benchmark_compare():
+    results = benchmark.run([10], [6], repeat=1,
+            names=['spawn', 'crossover'])
+
+    assert sorted(results) == ['crossover[genes=6]', 'spawn[pop=10,genes=6]']
+
+    slower = dict((k, {'best': v['best']*2}) for k, v in results.items())
+
+    assert benchmark.compare(results, results) == []
+    assert sorted(benchmark.compare(results, slower)) == sorted(results)
@@ -0,0 +1,66 @@
+from pyneat import Conf
+from pyneat import Population
+from pyneat.genotype import Genome
+
+import os
+import shutil
+import tempfile
+import numpy as np
+
+def test_checkpoint_resume():
+    conf = Conf(pop_size=30, mutate_neuron_prob=0.3, mutate_gene_prob=0.3)
+
+    genome = Genome.minimal_fully_connected(0, (3, 2))
+
+    directory = tempfile.mkdtemp()
+
+    def generation(pop):
+        for o in pop.organisms:
+            o.fitness = float(np.abs(o.genome.weights).sum())
+
+        pop.epoch(None)
+
+    def state(pop):
+        return ([(s.species_id, s.age_since_imp) for s in pop.species],
+                [(o.genome.genome_id, o.genome.neurons,
+                    o.genome.innovs.tolist(), o.genome.weights.tolist())
+                    for o in pop.organisms],
+                np.random.random())
+
+    try:
+        np.random.seed(2)
+
+        pop = Population(conf)
+
+        pop.spawn(genome)
+
+        generation(pop)
+
+        full = os.path.join(directory, 'full.npz')
+
+        pop.save(full)
+
+        generation(pop)
+
+        delta = os.path.join(directory, 'delta.npz')
+
+        pop.save(delta, full)
+
+        for x in xrange(3):
+            generation(pop)
+
+        expected = state(pop)
+
+        loaded = Population.load(delta, conf)
+
+        assert loaded.generation == 3
+
+        for x in xrange(3):
+            generation(loaded)
+
+        assert state(loaded) == expected
+
+        with np.load(full) as f, np.load(delta) as d:
+            assert len(d['genome_id']) < len(f['genome_id'])
+    finally:
+        shutil.rmtree(directory)
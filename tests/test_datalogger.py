@@ -0,0 +1,122 @@
+from pyneat import Conf
+from pyneat import Species
+from pyneat import Population
+from pyneat import Organism
+from pyneat import DataLogger
+from pyneat import DataObserver
+from pyneat.genotype import Genome
+
+import time
+
+class RecordingObserver(DataObserver):
+    def __init__(self):
+        self.events = []
+        self.flushes = 0
+
+    def experiment(self, name, conf, dt):
+        self.events.append(('experiment', name, dt))
+
+    def experiment_end(self, dt):
+        time.sleep(0.01)
+
+        self.events.append(('experiment_end', dt))
+
+    def population(self, pop_index):
+        self.events.append(('population', pop_index))
+
+    def generation(self, gen_index, species):
+        self.events.append(('generation', gen_index, species))
+
+    def progress(self, progress, message):
+        self.events.append(('progress', progress))
+
+    def flush(self):
+        self.flushes += 1
+
+def test_queued_logger():
+    observer = RecordingObserver()
+
+    logger = DataLogger(queued=True, max_pending=4, batch_size=2)
+
+    logger.add_observer(observer)
+
+    species = Species(1)
+
+    for x in xrange(3):
+        o = Organism(Genome.minimal_fully_connected(x, (3, 2)))
+
+        o.fitness = float(x)
+
+        species.organisms.append(o)
+
+    logger.notify_experiment('test', None)
+    logger.notify_population(1)
+
+    for x in xrange(10):
+        logger.notify_generation(x+1, [species])
+        logger.notify_progress(progress=x)
+
+    species.organisms[0].fitness = 10.0
+
+    logger.notify_experiment_end()
+
+    assert len(observer.events) == 23
+    assert observer.events[-1][0] == 'experiment_end'
+    assert observer.events[0][2] <= observer.events[-1][1]
+    assert observer.flushes > 0
+
+    generations = [e for e in observer.events if e[0] == 'generation']
+
+    assert [e[1] for e in generations] == range(1, 11)
+
+    record = list(generations[-1][2])[0]
+
+    assert record.species_id == 1
+    assert record.fitness.tolist() == [0.0, 1.0, 2.0]
+    assert record.genome_ids.tolist() == [0, 1, 2]
+
+def test_logger_timestamps():
+    observer = RecordingObserver()
+
+    logger = DataLogger()
+
+    logger.add_observer(observer)
+
+    logger.notify_experiment('test', None)
+
+    time.sleep(0.01)
+
+    logger.notify_experiment('test', None)
+
+    assert observer.events[0][2] < observer.events[1][2]
+
+def test_epoch_stats():
+    class StatsObserver(RecordingObserver):
+        def epoch_stats(self, stats):
+            self.events.append(('epoch_stats', stats))
+
+    observer = StatsObserver()
+
+    logger = DataLogger()
+
+    logger.add_observer(observer)
+
+    conf = Conf(pop_size=20)
+
+    pop = Population(conf)
+
+    pop.spawn(Genome.minimal_fully_connected(0, (3, 1)))
+
+    for o in pop.organisms:
+        o.genome.genesis(conf)
+
+    pop.epoch(logger)
+
+    stats = observer.events[-1][1]
+
+    assert stats.generation == 1
+    assert list(stats.timings) == ['cull', 'stagnation', 'rank', 'weak',
+            'reproduce', 'speciate']
+    assert stats.total >= 0.0
+    assert stats.counters['phenotypes'] >= 20
+    assert stats.counters['compat_checks'] > 0
@@ -0,0 +1,131 @@
+from pyneat import Conf
+from pyneat.genotype import Genome
+from pyneat.evaluator import ParallelEvaluator
+from pyneat.evaluator import SerialEvaluator
+from pyneat.evaluator import CachedEvaluator
+from pyneat.evaluator import create_evaluator
+from pyneat.evaluator import fitness_function
+
+import numpy as np
+
+def test_parallel_matches_serial():
+    conf = Conf(workers=2, chunksize=3)
+
+    genome = Genome.minimal_fully_connected(0, (3, 1))
+
+    genomes = []
+
+    for x in xrange(10):
+        new_genome = genome.duplicate(x)
+
+        new_genome.mutate_weights(conf.mutate_power, 1.0, 1)
+
+        genomes.append(new_genome)
+
+    serial = list(SerialEvaluator(conf).evaluate(genomes))
+
+    evaluator = ParallelEvaluator(conf)
+
+    parallel = list(evaluator.evaluate(genomes))
+
+    evaluator.close()
+
+    assert parallel == serial
+
+BATCH_FITNESS = """def evaluate_population(batch_net):
+    res = np.hstack([batch_net.activate(d) for d in DATA])
+
+    return res.sum(axis=1), res[:, 0] > 0.5
+
+DATA = ((0.0, 0.0, 1.0),
+        (1.0, 0.0, 1.0),
+        (0.0, 1.0, 1.0),
+        (1.0, 1.0, 1.0))
+"""
+
+def evaluate(net):
+    data = ((0.0, 0.0, 1.0),
+            (1.0, 0.0, 1.0),
+            (0.0, 1.0, 1.0),
+            (1.0, 1.0, 1.0))
+
+    res = [net.activate(d) for d in data]
+
+    return sum(res), res[0] > 0.5
+
+def test_batch_matches_serial():
+    genome = Genome.minimal_fully_connected(0, (3, 1))
+
+    genomes = []
+
+    for x in xrange(10):
+        new_genome = genome.duplicate(x)
+
+        new_genome.mutate_weights(2.5, 1.0, 1)
+
+        genomes.append(new_genome)
+
+    serial = list(SerialEvaluator(Conf(fitness_func=evaluate)).evaluate(
+        genomes))
+
+    conf = Conf(fitness_func=BATCH_FITNESS, batch_fitness=True)
+
+    batch = list(create_evaluator(conf).evaluate(genomes))
+
+    assert np.allclose([x[0] for x in batch], [x[0] for x in serial])
+    assert [x[1] for x in batch] == [x[1] for x in serial]
+
+    conf = Conf(fitness_func='test_evaluator:evaluate', workers=2)
+
+    evaluator = create_evaluator(conf)
+
+    parallel = list(evaluator.evaluate(genomes))
+
+    evaluator.close()
+
+    assert parallel == serial
+    assert '"test_evaluator:evaluate"' in Conf(fitness_func=evaluate).to_json()
+
+def test_fitness_function():
+    evaluate = fitness_function('def evaluate(net): return 1.0, False',
+            'evaluate')
+
+    assert evaluate(None) == (1.0, False)
+    assert fitness_function('math:sqrt', 'evaluate')(4.0) == 2.0
+
+def test_cached_evaluator():
+    conf = Conf(fitness_func=evaluate, fitness_cache_size=8)
+
+    genome = Genome.minimal_fully_connected(0, (3, 1))
+
+    genomes = [genome.duplicate(x) for x in xrange(3)]
+
+    genomes[1].mutate_weights(2.5, 1.0, 1)
+
+    evaluator = create_evaluator(conf)
+
+    assert isinstance(evaluator, CachedEvaluator)
+
+    first = list(evaluator.evaluate(genomes))
+
+    assert (evaluator.hits, evaluator.misses) == (1, 2)
+    assert first[0] == first[2]
+
+    genomes.append(genomes[1].duplicate(3))
+
+    second = list(evaluator.evaluate(genomes))
+
+    assert (evaluator.hits, evaluator.misses) == (4, 0)
+    assert second == first+[first[1]]
+
+    assert not isinstance(create_evaluator(Conf()), CachedEvaluator)
+
+def test_template_cache_size():
+    size = Genome.templates.size
+
+    try:
+        create_evaluator(Conf(phenotype_cache_size=8)).close()
+
+        assert Genome.templates.size == 8
+    finally:
+        Genome.templates.resize(size)
@@ -0,0 +1,126 @@
+from pyneat import Conf
+from pyneat import DataLogger
+from pyneat import DataObserver
+from pyneat import Experiment
+from pyneat import Population
+from pyneat.genotype import Genome
+
+import multiprocessing
+
+class GenerationObserver(DataObserver):
+    def __init__(self):
+        self.events = []
+
+    def experiment(self, name, conf, dt):
+        pass
+
+    def experiment_end(self, dt):
+        self.events.append('end')
+
+    def population(self, pop_index):
+        self.events.append(('population', pop_index))
+
+    def generation(self, gen_index, species):
+        self.events.append((gen_index, [(s.species_id, s.max_fitness)
+            for s in species]))
+
+    def progress(self, progress, message):
+        self.events.append(progress)
+
+def run(**kwargs):
+    observer = GenerationObserver()
+
+    logger = DataLogger()
+
+    logger.add_observer(observer)
+
+    kwargs.setdefault('runs', 3)
+    kwargs.setdefault('fitness_func',
+            'def evaluate(net):\n    return 1.0, False\n')
+
+    conf = Conf(pop_size=30, generations=4, seed=5, **kwargs)
+
+    Experiment().run('test', conf, logger)
+
+    return observer.events
+
+def test_parallel_runs():
+    sequential = run()
+
+    assert run(parallel_runs=3) == sequential
+    assert [e for e in sequential if isinstance(e, tuple) and
+            e[0] == 'population'] == [('population', x) for x in (1, 2, 3)]
+    assert sequential[-2:] == [100.0, 'end']
+
+def test_islands():
+    events = run(islands=2, migration_interval=2, runs=2)
+
+    populations = [e[1] for e in events if isinstance(e, tuple) and
+            e[0] == 'population']
+
+    assert populations == [1, 2]*4+[3, 4]*4
+    assert events[-2:] == [100.0, 'end']
+
+def test_islands_winner():
+    fitness_func = 'def evaluate(net):\n    return 1.0, True\n'
+
+    sequential = run(runs=1, fitness_func=fitness_func)
+    islands = run(runs=1, islands=2, fitness_func=fitness_func)
+
+    assert [e[0] for e in islands[:-1]] == ['population', 1]
+    assert [e[0] for e in sequential[:-1]] == ['population', 1]
+
+def test_islands_resume():
+    conf = Conf(islands=2)
+
+    try:
+        Experiment().run('islands', conf, resume='missing.npz')
+    except ValueError:
+        return
+
+    assert False
+
+def test_islands_unsupported():
+    for kwargs in ({'checkpoint_interval': 1},
+            {'innovation_mode': 'content'},
+            {'reproduction_workers': 2}):
+        try:
+            Experiment().run('islands', Conf(islands=2, **kwargs))
+        except ValueError:
+            continue
+
+        assert False, kwargs
+
+def test_content_innovations():
+    kwargs = dict(innovation_mode='content', mutate_gene_prob=0.3,
+            mutate_neuron_prob=0.3, runs=1)
+
+    serial = run(**kwargs)
+
+    assert run(reproduction_workers=2, **kwargs) == serial
+
+    conf = Conf(pop_size=30, innovation_mode='content',
+            mutate_neuron_prob=0.5, seed=1)
+
+    pop = Population(conf)
+
+    pop.spawn(Genome.minimal_fully_connected(0, (3, 1)))
+
+    pop.epoch(None)
+
+    innovs = [i for o in pop.organisms for i in o.genome.innovs.tolist()
+            if i > 3]
+
+    # Content ids are 60 bit hashes rather than counted from 4
+    assert innovs and min(innovs) > 2**32
+
+def test_evaluator_closed_on_error():
+    conf = Conf(pop_size=10, workers=2, fitness_cache_size=0,
+            fitness_func='def evaluate(net):\n    raise ValueError()\n')
+
+    try:
+        Experiment().run('error', conf)
+    except ValueError:
+        pass
+
+    assert not multiprocessing.active_children()
@@ -1,9 +1,15 @@
 from pyneat import Conf
 from pyneat import Innovations
+from pyneat.genotype import Gene
 from pyneat.genotype import Genome
+from pyneat.ann import RecurrentNeuralNetwork as RNN
+from pyneat.ann import SparseNeuralNetwork as SparseRNN
+from pyneat.ann import FeedForwardNeuralNetwork as FFNN
+from pyneat.ann import CompiledFeedForwardNetwork as CompiledFFNN
 
 import mock
 import random
+import numpy as np
 
 def test_genome():
     genome = Genome.minimal_fully_connected(0, (3, 2))
@@ -176,3 +182,159 @@ def test_genesis():
 
     assert net
     assert net.dim == [3, 0, 2]
+
+def test_batch_genesis():
+    genomes = [Genome.minimal_fully_connected(x, (3, 2)) for x in xrange(4)]
+
+    for g in genomes:
+        g.mutate_weights(2.5, 1.0, 1)
+
+    batch = Genome.batch_genesis(genomes)
+
+    res = batch.activate((1.0, 0.5, 1.0))
+
+    assert res.shape == (4, 2)
+
+    for k, g in enumerate(genomes):
+        out = g.genesis().activate((1.0, 0.5, 1.0))
+
+        assert abs(res[k, 0]-out[0]) < 1e-12
+        assert abs(res[k, 1]-out[1]) < 1e-12
+
+def test_distance():
+    conf = Conf()
+    innovations = Innovations()
+
+    g1 = Genome.minimal_fully_connected(0, (3, 2))
+
+    innovations.innov = len(g1.genes)
+
+    g2 = g1.duplicate(1)
+
+    assert g1.distance(conf, g2) == 0.0
+
+    g2.genes[0].weight += 1.0
+
+    assert abs(g1.distance(conf, g2)+conf.coef_matching/6.0) < 1e-12
+
+    g2.add_gene(Gene(0, 3, 1.0, innovations.next_innov()))
+    g2.add_gene(Gene(3, Genome.MAX_HIDDEN, 1.0, innovations.next_innov()))
+
+    assert abs(g1.distance(conf, g2)-
+            (2*conf.coef_disjoint-conf.coef_matching/6.0)) < 1e-12
+
+def test_genesis_template():
+    conf = Conf(phenotype_cache_size=8)
+
+    g1 = Genome.minimal_fully_connected(0, (3, 2))
+
+    g1.mutate_weights(2.5, 1.0, 1)
+
+    g2 = g1.duplicate(1)
+
+    g2.mutate_weights(2.5, 1.0, 1)
+    g2.genes[1].enabled = False
+
+    Genome.templates.clear()
+
+    for g in (g1, g2, g1):
+        net = g.genesis(conf)
+
+        for x in g.genes:
+            index = net.link_index(x.inode, x.onode-Genome.MAX_HIDDEN+3)
+
+            assert net.weights[index] == (x.weight if x.enabled else 0.0)
+
+    assert len(Genome.templates) == 2
+    assert Genome.templates.hits == 1
+
+def test_crossover_arrays():
+    innovs = Innovations()
+
+    mom = Genome.minimal_fully_connected(0, (3, 2))
+
+    innovs.innov = len(mom.genes)
+
+    dad = mom.duplicate(1)
+
+    dad.mutate_neuron(innovs)
+    dad.mutate_weights(2.5, 1.0, 1)
+
+    baby = mom.crossover(dad, 1.0, 2.0, innovs)
+
+    assert len(baby.genes) == 8
+    assert baby.neurons == [3, 1, 2]
+    assert list(baby.innovs) == sorted(dad.innovs)
+
+    for g in baby.genes:
+        parents = [x for x in mom.genes+dad.genes if x.innov == g.innov]
+
+        assert (g.weight, g.enabled) in [(x.weight, x.enabled)
+                for x in parents]
+
+    baby.genes[0].weight = 5.0
+
+    assert baby.weights[0] == 5.0
+    assert dad.weights[list(dad.innovs).index(baby.innovs[0])] != 5.0
+
+def test_genesis_engine():
+    conf = Conf(engine='auto', sparse_min_hidden=1, sparse_density=1.0,
+            allow_recurrent=True, compile_threshold=0)
+
+    innovs = Innovations()
+
+    genome = Genome.minimal_fully_connected(0, (3, 2))
+
+    innovs.innov = len(genome.genes)
+
+    genome.mutate_neuron(innovs)
+
+    dense = genome.genesis()
+    sparse = genome.genesis(conf)
+
+    assert isinstance(dense, RNN)
+    assert isinstance(sparse, SparseRNN)
+    assert np.allclose(dense.activate((1.0, 0.5, 1.0)),
+            sparse.activate((1.0, 0.5, 1.0)))
+
+    conf.allow_recurrent = False
+
+    assert isinstance(genome.genesis(conf), FFNN)
+
+    conf.compile_threshold = 32
+
+    assert isinstance(genome.genesis(conf), CompiledFFNN)
+
+def test_batch_mutate_weights():
+    genomes = [Genome.minimal_fully_connected(x, (3, 2)) for x in xrange(10)]
+
+    genomes[0].mutate_neuron(Innovations())
+
+    weights = [g.weights.copy() for g in genomes]
+
+    Genome.batch_mutate_weights(genomes, 2.5, 1.0, 0, 1.0)
+
+    for g, w in zip(genomes, weights):
+        assert len(g.weights) == len(w)
+        assert np.all(np.abs(g.weights) <= 1.0)
+
+    Genome.batch_mutate_weights(genomes, 0.5, 1.0, 1)
+
+    for g in genomes:
+        assert np.all(np.abs(g.weights) <= 0.5)
+        assert len(set(g.weights)) == len(g.weights)
+        assert g.weights.base is None
+
+    copies = [g.duplicate(g.genome_id) for g in genomes]
+
+    np.random.seed(3)
+
+    Genome.batch_mutate_weights(genomes, 2.5, 0.5, 0, 3.0)
+
+    np.random.seed(3)
+
+    for g in copies:
+        g.mutate_weights(2.5, 0.5, 0, 3.0)
+
+    for g1, g2 in zip(genomes, copies):
+        assert g1.weights.tolist() == g2.weights.tolist()
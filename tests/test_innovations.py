@@ -0,0 +1,105 @@
+from pyneat import Innovations
+from pyneat.innovations import ContentInnovations
+from pyneat.island import InnovationRegistry
+from pyneat.island import SharedInnovations
+from pyneat.genotype import Gene
+from pyneat.genotype import Genome
+
+def test_gene_innov():
+    innovs = Innovations()
+
+    gene = Gene(0, 1000, 0.5, innovs.next_innov())
+
+    assert innovs.check_gene(0, 1000) is None
+
+    innovs.create_gene_innov(gene)
+
+    innov = innovs.check_gene(0, 1000)
+
+    assert innovs.check_gene(1000, 0) is None
+
+    new_gene = innovs.create_gene_from_innov(innov)
+
+    assert (new_gene.inode, new_gene.onode, new_gene.weight,
+            new_gene.innov) == (0, 1000, 0.5, 0)
+
+def test_neuron_innov():
+    innovs = Innovations()
+
+    old = Gene(0, 1000, 0.5, innovs.next_innov())
+    g1 = Gene(0, 3, 1.0, innovs.next_innov())
+    g2 = Gene(3, 1000, 0.5, innovs.next_innov())
+
+    innovs.create_neuron_innov(old, g1, g2, 3)
+
+    assert innovs.check_neuron(0, 1000, 1) is None
+
+    g1, g2 = innovs.create_neuron_from_innov(innovs.check_neuron(0, 1000, 0))
+
+    assert (g1.inode, g1.onode, g1.innov) == (0, 3, 1)
+    assert (g2.inode, g2.onode, g2.weight, g2.innov) == (3, 1000, 0.5, 2)
+
+def test_shared_innovations():
+    registry = InnovationRegistry(10)
+
+    island1 = SharedInnovations(registry)
+    island2 = SharedInnovations(registry)
+
+    # Both islands find the mutation new before either registers it
+    gene1 = Gene(0, 1000, 0.5, island1.next_innov())
+    gene2 = Gene(0, 1000, -0.5, island2.next_innov())
+
+    island1.create_gene_innov(gene1)
+    island2.create_gene_innov(gene2)
+
+    assert gene1.innov == gene2.innov == 10
+
+    old = Gene(0, 1000, 0.5, 10)
+
+    g1, g2 = Gene(0, 4, 1.0, 12), Gene(4, 1000, 0.5, 13)
+
+    island1.create_neuron_innov(old, g1, g2, 4)
+
+    g3, g4 = Gene(0, 5, 1.0, 14), Gene(5, 1000, 0.5, 15)
+
+    island2.create_neuron_innov(old, g3, g4, 5)
+
+    assert (g3.onode, g4.inode, g3.innov, g4.innov) == (4, 4, 12, 13)
+    assert island2.check_gene(0, 1000).innov == 10
+    assert SharedInnovations(registry).check_neuron(0, 1000, 10).neuron == 4
+
+def test_content_overlay():
+    innovs = ContentInnovations()
+
+    innovs.create_gene_innov(Gene(0, 1000, 0.5, innovs.next_innov()))
+
+    overlay = innovs.overlay()
+
+    assert overlay.check_gene(0, 1000) is innovs.check_gene(0, 1000)
+
+    overlay.create_gene_innov(Gene(1, 1000, -0.5, overlay.next_innov()))
+
+    assert overlay.gene_innov.keys() == [(1, 1000)]
+    assert innovs.check_gene(1, 1000) is None
+
+    innovs.merge(overlay.gene_innov, overlay.neuron_innov)
+
+    assert innovs.check_gene(1, 1000).weight == -0.5
+
+def test_content_neuron_range():
+    innovs = ContentInnovations()
+
+    neurons = []
+
+    for x in xrange(100):
+        old = Gene(x, Genome.MAX_HIDDEN, 0.5, x)
+        g1, g2 = Gene(x, 0, 1.0, 0), Gene(0, Genome.MAX_HIDDEN, 0.5, 0)
+
+        innovs.create_neuron_innov(old, g1, g2, 0)
+
+        neurons.append(g1.onode)
+
+    assert len(set(neurons)) == len(neurons)
+    assert all(ContentInnovations.NEURON_BASE <= x < Genome.MAX_HIDDEN
+            for x in neurons)
+    assert max(neurons) >= 2**32
@@ -1,7 +1,11 @@
 from pyneat import Conf
 from pyneat import Population
+from pyneat import Organism
 from pyneat.genotype import Genome
 
+import random
+import numpy as np
+
 def test_population():
     conf = Conf()
 
@@ -13,3 +17,162 @@ def test_population():
 
     assert len(pop.organisms) == conf.pop_size
     assert len(pop.species) == 1
+
+def test_speciate_all():
+    conf = Conf(pop_size=20, compat_threshold=0.3)
+
+    genome = Genome.minimal_fully_connected(0, (3, 2))
+
+    pops = []
+
+    for x in xrange(2):
+        np.random.seed(1)
+
+        pop = Population(conf)
+
+        pop.spawn(genome)
+
+        pops.append(pop)
+
+    spawned = len(pops[0].species)
+
+    # Every child is lighter than the spawned organisms and the children
+    # before it, by more than the threshold allows, so each of them
+    # starts a species of its own
+    children = []
+
+    for weight in np.linspace(-5.0, -45.0, 20):
+        child = genome.duplicate(pops[0].innovs.next_genome())
+
+        child.weights = np.full(len(child.weights), weight)
+
+        child.invalidate()
+
+        children.append(child)
+
+    # Copies of spawned organisms join the species of their original
+    for o in pops[0].organisms[:10]:
+        children.append(o.genome.duplicate(pops[0].innovs.next_genome()))
+
+    for c in children:
+        pops[1].speciate(Organism(c))
+
+    pops[0].speciate_all([Organism(c) for c in children])
+
+    assert len(pops[0].species) == len(pops[1].species)
+    assert len(pops[0].species) == spawned+20
+
+    for s1, s2 in zip(pops[0].species, pops[1].species):
+        assert ([o.genome.genome_id for o in s1.organisms] ==
+                [o.genome.genome_id for o in s2.organisms])
+
+def test_plan_reproduction():
+    conf = Conf(pop_size=40, compat_threshold=0.5)
+
+    pop = Population(conf)
+
+    pop.spawn(Genome.minimal_fully_connected(0, (3, 2)))
+
+    for o in pop.organisms:
+        o.fitness = random.random()
+
+    pop.cull_species()
+    pop.remove_stagnating_species()
+    pop.rank()
+    pop.remove_weak_species()
+    pop.remove_marked()
+
+    # Leave a gap to fill
+    pop.species[0].offspring = 1
+
+    plan = pop.plan_reproduction()
+
+    assert sum(num for s, num, parents in plan) == \
+            conf.pop_size-len(pop.species)
+
+    for s, num, parents in plan:
+        assert parents.shape == (num, 2)
+        assert parents.min() >= 0 and parents.max() < len(s.organisms)
+
+    s, num, parents = plan[0]
+
+    champion = max(s.organisms, key=lambda x: x.fitness)
+
+    assert all(s.organisms[x] is champion for x in parents.ravel())
+
+def test_population_table():
+    conf = Conf(pop_size=60, compat_threshold=0.5)
+
+    pop = Population(conf)
+
+    pop.spawn(Genome.minimal_fully_connected(0, (3, 2)))
+
+    for o in pop.organisms:
+        o.fitness = round(random.random(), 1)
+
+    sizes = [len(s.organisms) for s in pop.species]
+
+    pop.cull_species()
+    pop.rank()
+
+    for s, size in zip(pop.species, sizes):
+        fitness = [o.fitness for o in s.organisms]
+
+        assert fitness == sorted(fitness, reverse=True)
+        assert sum(o.marked for o in s.organisms) == \
+                size-int(size*conf.survival_rate)-1
+
+    ranked = sorted(pop.organisms, key=lambda x: x.rank)
+
+    assert [o.rank for o in ranked] == range(1, len(pop.organisms)+1)
+    assert [o.fitness for o in ranked] == sorted(o.fitness for o in ranked)
+
+    pop.remove_weak_species()
+
+    for s in pop.species:
+        assert s.avg_fitness == float(sum(o.rank for o in s.organisms)) / \
+                len(s.organisms)
+
+def test_rank_after_fitness_change():
+    conf = Conf(pop_size=20)
+
+    pop = Population(conf)
+
+    pop.spawn(Genome.minimal_fully_connected(0, (3, 2)))
+
+    for o in pop.organisms:
+        o.fitness = random.random()
+
+    pop.cull_species()
+
+    for o in pop.organisms:
+        o.fitness = -o.fitness
+
+    pop.rank()
+
+    ranked = sorted(pop.organisms, key=lambda x: x.rank)
+
+    assert [o.fitness for o in ranked] == sorted(o.fitness for o in ranked)
+
+def test_epoch_seeded_by_numpy():
+    conf = Conf(pop_size=30, mutate_neuron_prob=0.3, mutate_gene_prob=0.3)
+
+    def evolve(other_seed):
+        # Only np.random is seeded, random must not matter
+        random.seed(other_seed)
+        np.random.seed(4)
+
+        pop = Population(conf)
+
+        pop.spawn(Genome.minimal_fully_connected(0, (3, 2)))
+
+        for x in xrange(3):
+            for o in pop.organisms:
+                o.fitness = float(np.abs(o.genome.weights).sum())
+
+            pop.epoch(None)
+
+        return [(o.genome.neurons, o.genome.innovs.tolist(),
+            o.genome.weights.tolist()) for o in pop.organisms]
+
+    assert evolve(1) == evolve(2)
@@ -1,4 +1,13 @@
-from ml.ann import RecurrentNeuralNetwork as RNN
+from pyneat.ann import RecurrentNeuralNetwork as RNN
+from pyneat.ann import BatchNeuralNetwork as BatchRNN
+from pyneat.ann import SparseNeuralNetwork as SparseRNN
+from pyneat.ann import FeedForwardNeuralNetwork as FFNN
+from pyneat.ann import CompiledNeuralNetwork as CompiledRNN
+from pyneat.ann import CompiledFeedForwardNetwork as CompiledFFNN
+from pyneat.ann import activation
+
+import math
+import numpy as np
 
 def test_creation():
     rnn = RNN((2, 5, 3))
@@ -42,3 +51,174 @@ def test_activate():
     res = rnn.activate((1.0, 1.0))
 
     assert res == 4.0
+
+def test_batch_activate():
+    nets = []
+
+    for h in xrange(3):
+        rnn = RNN((2, h, 1))
+
+        rnn.add_link(0, 2+h, 0.5)
+        rnn.add_link(1, 2+h, -1.0)
+
+        for x in xrange(h):
+            rnn.add_link(0, 2+x, 1.0)
+            rnn.add_link(2+x, 2+h, 1.0)
+
+        nets.append(rnn)
+
+    batch = BatchRNN(nets)
+
+    assert batch.dim == (2, 2, 1)
+
+    for d in ((1.0, 0.0), (0.5, 2.0)):
+        res = batch.activate(d)
+
+        assert res.shape == (3, 1)
+
+        for k, rnn in enumerate(nets):
+            assert abs(res[k, 0]-rnn.activate(d)) < 1e-12
+
+def test_activate_batch():
+    rnn = RNN((2, 2, 1), lambda x: x*0.5)
+
+    rnn.add_link(0, 2)
+    rnn.add_link(1, 3)
+    rnn.add_link(2, 4)
+    rnn.add_link(3, 4)
+    rnn.add_link(4, 2, 0.5)
+
+    data = ((1.0, 1.0), (0.0, 2.0), (3.0, -1.0))
+
+    streams = [RNN((2, 2, 1), lambda x: x*0.5) for d in data]
+
+    for s in streams:
+        s.wi, s.wh, s.wo, s.wb = rnn.wi, rnn.wh, rnn.wo, rnn.wb
+
+    for step in xrange(3):
+        res = rnn.activate_batch(data)
+
+        assert res.shape == (3, 1)
+
+        for k, d in enumerate(data):
+            assert abs(res[k, 0]-streams[k].activate(d)) < 1e-12
+
+def test_activation_groups():
+    rnn = RNN((1, 2, 2), activations=(activation.RELU, activation.TANH,
+        activation.IDENTITY, activation.SIGMOID))
+
+    rnn.add_link(0, 1, -1.0)
+    rnn.add_link(0, 2, 0.5)
+    rnn.add_link(1, 3)
+    rnn.add_link(2, 4)
+
+    res = rnn.activate((2.0,))
+
+    assert res[0] == 0.0
+    assert abs(res[1]-1/(1+math.exp(-4.9*math.tanh(1.0)))) < 1e-12
+
+def test_activation_functions():
+    x = np.linspace(-3.0, 3.0, 13)
+
+    sigmoid = activation.ACTIVATIONS[activation.by_name('sigmoid')].func
+
+    assert np.allclose(sigmoid(x), 1/(1+np.exp(-4.9*x)))
+    assert np.allclose(activation.gaussian(x), np.exp(-x*x))
+    assert np.allclose(activation.relu(x), np.where(x > 0, x, 0.0))
+
+def recurrent_network(engine):
+    """Network with recurrent links and mixed activations."""
+    dim = (3, 4, 2)
+
+    links = [(0, 3), (1, 4), (2, 6), (3, 4), (5, 3), (4, 7), (6, 8),
+            (7, 5), (8, 6), (0, 7), (1, 8), (6, 6)]
+
+    inodes = np.array([x for x, y in links])
+    onodes = np.array([y for x, y in links])
+    weights = np.linspace(-2.0, 2.0, len(links))
+    activations = [activation.SIGMOID, activation.TANH, activation.RELU,
+            activation.SINE, activation.SIGMOID, activation.GAUSSIAN]
+
+    return engine.from_template(
+            engine.template(dim, activations, inodes, onodes), weights)
+
+def test_sparse_matches_dense():
+    dense = recurrent_network(RNN)
+    sparse = recurrent_network(SparseRNN)
+
+    for d in ((1.0, 0.0, 1.0), (0.5, -1.0, 2.0), (0.0, 0.0, 0.0)):
+        res1 = dense.activate(d)
+        res2 = sparse.activate(d)
+
+        assert np.allclose(res1, res2)
+
+def feedforward_template(engine, activations):
+    """Template of a feed forward network with 7 links."""
+    dim = (2, 3, 1)
+
+    links = [(0, 2), (1, 2), (2, 3), (3, 4), (0, 4), (4, 5), (1, 5)]
+
+    inodes = np.array([x for x, y in links])
+    onodes = np.array([y for x, y in links])
+
+    return engine.template(dim, activations, inodes, onodes)
+
+def test_feedforward():
+    weights = np.array([1.0, 1.0, 0.5, 2.0, -1.0, 1.0, 3.0])
+
+    template = feedforward_template(FFNN, [activation.IDENTITY]*4)
+
+    assert len(template[1]) == 4
+
+    net = FFNN.from_template(template, weights)
+
+    assert net.activate((1.0, 2.0)) == 1.0*3.0-1.0+6.0
+    assert net.activate((0.0, 0.0)) == 0.0
+
+def test_feedforward_cycle():
+    inodes = np.array([0, 2, 3])
+    onodes = np.array([2, 3, 2])
+
+    try:
+        FFNN.template((1, 2, 1), None, inodes, onodes)
+    except ValueError:
+        return
+
+    assert False
+
+def test_compiled_matches_dense():
+    dense = recurrent_network(RNN)
+    compiled = recurrent_network(CompiledRNN)
+
+    for d in ((1.0, 0.0, 1.0), (0.5, -1.0, 2.0), (0.0, 0.0, 0.0)):
+        assert np.allclose(dense.activate(d), compiled.activate(d))
+
+def test_compiled_feedforward():
+    weights = np.linspace(-1.0, 1.0, 7)
+    activations = [activation.SIGMOID, activation.TANH, activation.RELU,
+            activation.SIGMOID]
+
+    net = FFNN.from_template(feedforward_template(FFNN, activations),
+            weights)
+    compiled = CompiledFFNN.from_template(
+            feedforward_template(CompiledFFNN, activations), weights)
+
+    for d in ((1.0, 2.0), (0.5, -1.0)):
+        assert abs(net.activate(d)-compiled.activate(d)) < 1e-12
+
+def test_activate_sequence():
+    data = np.linspace(-1.0, 1.0, 30).reshape((10, 3))
+
+    for engine in (RNN, SparseRNN, CompiledRNN):
+        net = recurrent_network(engine)
+
+        expected = [net.activate(d) for d in data]
+
+        net = recurrent_network(engine)
+
+        assert np.allclose(net.activate_sequence(data[:4]), expected[:4])
+        assert np.allclose(net.activate_sequence(data[4:]), expected[4:])
+
+        net.reset()
+
+        assert np.allclose(net.activate_sequence(data), expected)